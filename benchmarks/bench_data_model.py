@@ -0,0 +1,109 @@
+# bench_data_model.py
+#
+# Memory benchmark for the shared data model at 100k chunks/passages:
+# chunk dictionaries (pdf_retriever.chunk_text) against a ChunkTable, and
+# passage dictionaries against Passage objects.
+#
+#   python benchmarks/bench_data_model.py [--count N] [--chunk-size N]
+
+import os
+import gc
+import sys
+import time
+import argparse
+import tracemalloc
+from typing import Any, Callable, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
+
+from synthmed_model import ChunkTable, Passage  # noqa: E402
+
+
+def measure(build: Callable[[], Any]) -> Tuple[Any, int, float]:
+    """
+    Build an object and return it with its retained allocation size and
+    build time. Timing uses a separate untraced build, since tracemalloc
+    slows allocation-heavy code down several times.
+    """
+    gc.collect()
+    started = time.perf_counter()
+    build()
+    elapsed = time.perf_counter() - started
+
+    gc.collect()
+    tracemalloc.start()
+    value = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return value, size, elapsed
+
+
+def make_text(chunks: int, chunk_size: int, overlap: int) -> str:
+    """Generate document text that chunks into roughly the requested number of chunks."""
+    words = (chunks * (chunk_size - overlap)) // 8 + 1
+    return " ".join(f"word{i % 1000:03d}" for i in range(words))
+
+
+def passage_dict(i: int, text: str):
+    return {
+        "text": text,
+        "metadata": {
+            "source": f"synthmed_autism_kb/doc_{i % 500}.pdf",
+            "title": f"Document {i % 500}",
+            "author": "Unknown",
+            "disease_domain": "autism",
+            "pdf_path": f"knowledge_bases/autism/doc_{i % 500}.pdf"
+        }
+    }
+
+
+def passage_object(i: int, text: str) -> Passage:
+    return Passage(
+        text,
+        source=f"synthmed_autism_kb/doc_{i % 500}.pdf",
+        title=f"Document {i % 500}",
+        author="Unknown",
+        disease_domain="autism",
+        pdf_path=f"knowledge_bases/autism/doc_{i % 500}.pdf"
+    )
+
+
+def report(label: str, size: int, elapsed: float, baseline: int) -> None:
+    print(f"{label:<28} {size / 2**20:>10.1f} {elapsed:>9.2f} {size / baseline:>8.2f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark data model memory use.")
+    parser.add_argument("--count", type=int, default=100000, help="Chunks / passages to build")
+    parser.add_argument("--chunk-size", type=int, default=200, help="Chunk size in characters")
+    args = parser.parse_args()
+
+    overlap = args.chunk_size // 5
+    text = make_text(args.count, args.chunk_size, overlap)
+
+    print(f"{'representation':<28} {'MiB':>10} {'seconds':>9} {'vs dict':>9}")
+
+    def build_table() -> ChunkTable:
+        table = ChunkTable()
+        table.add_word_chunks(text, chunk_size=args.chunk_size, overlap=overlap)
+        return table
+
+    table, table_size, table_time = measure(build_table)
+    dicts, dict_size, dict_time = measure(lambda: build_table().to_dicts())
+    assert len(dicts) == len(table) and dicts[-1] == table[-1].to_dict()
+    print(f"{len(table)} chunks of {args.chunk_size} chars")
+    report("chunk dicts", dict_size, dict_time, dict_size)
+    report("ChunkTable", table_size, table_time, dict_size)
+    del dicts, table
+
+    texts = [f"Passage {i}. " + "x" * 300 for i in range(args.count)]
+    dicts, dict_size, dict_time = measure(lambda: [passage_dict(i, t) for i, t in enumerate(texts)])
+    passages, passage_size, passage_time = measure(lambda: [passage_object(i, t) for i, t in enumerate(texts)])
+    assert [Passage.from_dict(d).to_dict() for d in dicts[:10]] == [p.to_dict() for p in passages[:10]]
+    print(f"{len(passages)} passages (text shared, metadata only)")
+    report("passage dicts", dict_size, dict_time, dict_size)
+    report("Passage objects", passage_size, passage_time, dict_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# bench_prompt_assembly.py
+#
+# Micro-benchmark for synthesis prompt assembly at 10, 100 and 1000 passages:
+# the per-call f-string/if-elif path (as MedicalSynthesizer used to build
+# prompts) against the precompiled PromptTemplate, both for rendering alone
+# and including the conversion to Passage objects.
+#
+#   python benchmarks/bench_prompt_assembly.py [--repeat N]
+
+import os
+import sys
+import json
+import argparse
+import timeit
+from typing import Dict, List, Any
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
+
+from llm_synthesizer import (  # noqa: E402
+    FORMAT_INSTRUCTIONS, get_prompt_template, parse_context_passages, to_passages
+)
+
+
+def make_passages(count: int, words: int = 150) -> List[Dict[str, Any]]:
+    """Generate synthetic passages shaped like knowledge base results."""
+    body = " ".join(f"token{i % 97}" for i in range(words))
+    return [
+        {
+            "text": f"Passage {i}. {body}",
+            "metadata": {
+                "source": f"synthmed_autism_kb/doc_{i}.pdf",
+                "disease_domain": "autism",
+                "title": f"Document {i}"
+            }
+        }
+        for i in range(count)
+    ]
+
+
+def legacy_prompt(query: str, passages: List[Dict[str, Any]], output_format: str) -> str:
+    """Per-call prompt assembly as MedicalSynthesizer did before PromptTemplate."""
+    context_parts = []
+    for i, passage in enumerate(passages):
+        text = passage.get("text", "")
+        metadata = passage.get("metadata", {})
+        source = metadata.get("source", "Unknown source")
+        domain = metadata.get("disease_domain", "general")
+        context_parts.append(f"[Source {i+1}: {source}, Domain: {domain}]\n{text}\n")
+    context = "\n---\n".join(context_parts)
+
+    if output_format == "comprehensive":
+        format_instructions = FORMAT_INSTRUCTIONS["comprehensive"]
+    elif output_format == "summary":
+        format_instructions = FORMAT_INSTRUCTIONS["summary"]
+    else:
+        format_instructions = FORMAT_INSTRUCTIONS["table"]
+
+    return f"""You are a medical research synthesis expert. Analyze the following research question and context to generate a comprehensive, accurate synthesis.
+
+Research Question:
+{query}
+
+Context from Medical Literature:
+{context}
+
+Instructions:
+{format_instructions}
+
+Requirements:
+- Synthesize information across all sources
+- Maintain scientific rigor and accuracy
+- Use proper citations [Source X]
+- Identify areas of consensus and disagreement
+- Note confidence levels and evidence quality
+- Avoid making clinical recommendations
+
+Synthesis:"""
+
+
+def best(func, number: int, repeat: int) -> float:
+    """Best per-call time of func in seconds."""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark synthesis prompt assembly.")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing rounds per case (best is reported)")
+    args = parser.parse_args()
+
+    query = "What genetic variants are shared between autism and epilepsy?"
+    template = get_prompt_template("comprehensive")
+
+    # render: prompt assembly alone, from already converted Passage objects
+    # dicts:  conversion (to_passages) plus render, from passage dictionaries
+    # json:   the llm_synthesizer tool path, from the context JSON string
+    #         (legacy: json.loads; template: parse_context_passages)
+    print(f"{'passages':>8} {'case':>7} {'legacy us':>12} {'template us':>12} {'speedup':>8}")
+    for count in (10, 100, 1000):
+        passages = make_passages(count)
+        context = json.dumps(passages)
+        model_passages = to_passages(passages)
+        number = max(1, 10000 // count)
+
+        prompt, _ = template.render(query, model_passages)
+        assert prompt == legacy_prompt(query, passages, "comprehensive")
+
+        legacy = best(lambda: legacy_prompt(query, passages, "comprehensive"), number, args.repeat)
+        cases = [
+            ("render", legacy, best(lambda: template.render(query, model_passages), number, args.repeat)),
+            ("dicts", legacy, best(lambda: template.render(query, to_passages(passages)), number, args.repeat)),
+            ("json",
+             best(lambda: legacy_prompt(query, json.loads(context), "comprehensive"), number, args.repeat),
+             best(lambda: template.render(query, parse_context_passages(context)), number, args.repeat))
+        ]
+        for case, old, new in cases:
+            print(f"{count:>8} {case:>7} {old * 1e6:>12.1f} {new * 1e6:>12.1f} {old / new:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
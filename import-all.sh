@@ -5,10 +5,11 @@ orchestrate env activate synthmed
 SCRIPT_DIR=$( cd -- "$( dirname -- "${BASH_SOURCE[0]}" )" &> /dev/null && pwd )
 
 # Import all tools
+# (files without @tool are shared modules, uploaded with each tool via the package root)
 for tool in ${SCRIPT_DIR}/tools/*.py; do
-  if [ -f "$tool" ]; then
+  if [ -f "$tool" ] && grep -q "^@tool" "$tool"; then
     echo "Importing tool: $tool"
-    orchestrate tools import -k python -r ${SCRIPT_DIR}/tools/requirements.txt -f "$tool"
+    orchestrate tools import -k python -r ${SCRIPT_DIR}/tools/requirements.txt -p ${SCRIPT_DIR}/tools -f "$tool"
   fi
 done
 echo "Removing temporary cache: tools/__pycache__"
@@ -26,10 +26,13 @@ done
 
 # Remove all tools
 for tool in ${SCRIPT_DIR}/tools/*.py; do
-  if [ -f "$tool" ]; then
+  if [ -f "$tool" ] && grep -q "^@tool" "$tool"; then
     filename=${tool##*/}
     toolname=${filename%.*}
     echo "Removing tool: $toolname"
     orchestrate tools remove --name $toolname
   fi
 done
+
+# Forget incremental sync state so the next sync-all.sh imports everything
+rm -f ${SCRIPT_DIR}/.synthmed_sync_state.json
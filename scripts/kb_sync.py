@@ -0,0 +1,578 @@
+# kb_sync.py
+
+import os
+import sys
+import json
+import argparse
+import hashlib
+import subprocess
+from typing import Dict, List, Any, Optional
+import yaml
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATE_FILE = ".synthmed_sync_state.json"
+STATE_VERSION = 1
+MAIN_AGENT = "synthmed_agent.yaml"
+
+
+def file_hash(path: str, block_size: int = 1 << 20) -> str:
+    """
+    Compute the SHA-256 content hash of a file.
+
+    Args:
+        path: Path to the file
+        block_size: Read size in bytes
+
+    Returns:
+        Hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def is_tool_file(path: str) -> bool:
+    """
+    Check whether a Python file defines an Orchestrate tool (has an @tool
+    decorator) rather than being a shared module the tools import.
+
+    Args:
+        path: Path to the Python file
+
+    Returns:
+        True if the file declares at least one tool
+    """
+    with open(path, encoding="utf-8") as f:
+        return any(line.startswith("@tool") for line in f)
+
+
+def diff_entries(old: Dict[str, str], new: Dict[str, str]) -> Dict[str, List[str]]:
+    """
+    Compare two {key: hash} mappings.
+
+    Args:
+        old: Previously synced hashes
+        new: Current hashes
+
+    Returns:
+        Dictionary with sorted added, changed, and removed keys
+    """
+    return {
+        "added": sorted(k for k in new if k not in old),
+        "changed": sorted(k for k in new if k in old and old[k] != new[k]),
+        "removed": sorted(k for k in old if k not in new)
+    }
+
+
+def validate_manifest(manifest_path: str) -> Dict[str, Any]:
+    """
+    Load a knowledge base manifest and check its documents against disk.
+
+    Document paths are resolved relative to the manifest's directory, the
+    same way `orchestrate knowledge-bases import` resolves them.
+
+    Args:
+        manifest_path: Path to a synthmed_*_kb.yaml manifest
+
+    Returns:
+        Dictionary containing:
+        - name: Knowledge base name
+        - spec: Manifest contents without the document list
+        - spec_hash: Hash of the spec (changes force a full import)
+        - documents: {manifest path: content hash} for documents on disk
+        - missing: Manifest paths that do not exist on disk
+        - errors: Structural problems with the manifest
+    """
+    with open(manifest_path, "r") as f:
+        manifest = yaml.safe_load(f) or {}
+
+    errors = []
+    name = manifest.get("name")
+    if not name:
+        errors.append("missing 'name'")
+        name = os.path.splitext(os.path.basename(manifest_path))[0]
+
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    documents = {}
+    missing = []
+
+    for entry in manifest.get("documents") or []:
+        doc_path = entry.get("path") if isinstance(entry, dict) else None
+        if not doc_path:
+            errors.append(f"invalid document entry: {entry!r}")
+            continue
+        if doc_path in documents or doc_path in missing:
+            errors.append(f"duplicate document entry: {doc_path}")
+            continue
+
+        abs_path = os.path.normpath(os.path.join(base_dir, doc_path))
+        if os.path.isfile(abs_path):
+            documents[doc_path] = file_hash(abs_path)
+        else:
+            missing.append(doc_path)
+
+    spec = {k: v for k, v in manifest.items() if k != "documents"}
+    spec_hash = hashlib.sha256(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()
+
+    return {
+        "name": name,
+        "spec": spec,
+        "spec_hash": spec_hash,
+        "documents": documents,
+        "missing": missing,
+        "errors": errors
+    }
+
+
+class OrchestrateCLI:
+    """
+    Thin wrapper around the `orchestrate` command line.
+    """
+
+    def __init__(self, dry_run: bool = False):
+        """
+        Initialize the CLI wrapper.
+
+        Args:
+            dry_run: Print commands instead of running them
+        """
+        self.dry_run = dry_run
+
+    def run(self, *args: str) -> bool:
+        """
+        Run an orchestrate command.
+
+        Args:
+            args: Command arguments after `orchestrate`
+
+        Returns:
+            True if the command succeeded (always True in dry-run mode)
+        """
+        command = ["orchestrate", *args]
+        print("+ " + " ".join(command))
+        if self.dry_run:
+            return True
+        return subprocess.run(command).returncode == 0
+
+    def capture(self, *args: str) -> Optional[str]:
+        """
+        Run a read-only orchestrate command and capture its output. Runs
+        even in dry-run mode, since it changes nothing.
+
+        Args:
+            args: Command arguments after `orchestrate`
+
+        Returns:
+            Standard output, or None if the command failed
+        """
+        command = ["orchestrate", *args]
+        print("+ " + " ".join(command))
+        try:
+            completed = subprocess.run(command, capture_output=True, text=True)
+        except OSError as e:
+            print(f"ERROR: {e}")
+            return None
+        if completed.returncode != 0:
+            print(completed.stderr, end="")
+            return None
+        return completed.stdout
+
+
+def parse_status_documents(output: str) -> Optional[List[str]]:
+    """
+    Extract document file names from `orchestrate knowledge-bases status -v`.
+
+    Args:
+        output: Command output (a JSON object, possibly surrounded by log lines)
+
+    Returns:
+        Sorted original file names, or None if the output has no JSON status
+    """
+    start, end = output.find("{"), output.rfind("}")
+    if start < 0 or end < start:
+        return None
+    try:
+        status = json.loads(output[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+    return sorted(
+        (doc.get("metadata") or {}).get("original_file_name", "")
+        for doc in status.get("documents") or []
+    )
+
+
+class SynthMedSync:
+    """
+    Incremental importer for SynthMed tools, knowledge bases, and agents.
+
+    A local state file records the content hash of every tool file, every
+    knowledge base document, and every agent YAML as of the last successful
+    import. Each run hashes the tree again and only pushes the delta:
+
+    - Tools and agents are re-imported when their file (or, for tools,
+      requirements.txt or a shared module in tools/) changed.
+    - Knowledge bases with added, changed, or removed documents, or a
+      changed spec (description, ...), are updated by importing the full
+      list of documents on disk under the same name. Importing an existing
+      knowledge base replaces its document set with the listed documents
+      (unlisted ones are removed) and there is no per-document add/delete,
+      so the upload always lists every document; unchanged knowledge bases
+      are skipped entirely.
+    - A knowledge base whose name changed is removed under its old name and
+      imported under the new one.
+
+    After each knowledge base import the live document list is read back
+    with `orchestrate knowledge-bases status` and compared with disk; a
+    mismatch fails the sync and leaves the state untouched.
+
+    Manifest entries that are missing on disk are reported and left out of
+    the uploaded manifest rather than failing the whole import.
+    """
+
+    def __init__(self,
+                 root_dir: str = ROOT_DIR,
+                 state_path: Optional[str] = None,
+                 cli: Optional[OrchestrateCLI] = None,
+                 force: bool = False):
+        """
+        Initialize the sync engine.
+
+        Args:
+            root_dir: Repository root containing tools/, knowledge_bases/, agents/
+            state_path: Path to the sync state file
+            cli: Orchestrate CLI wrapper
+            force: Ignore previous state and import everything
+        """
+        self.root_dir = root_dir
+        self.state_path = state_path or os.path.join(root_dir, STATE_FILE)
+        self.cli = cli or OrchestrateCLI()
+        self.force = force
+        self.state = self._empty_state() if force else self._load_state()
+
+    def _empty_state(self) -> Dict[str, Any]:
+        return {"version": STATE_VERSION, "tools": {}, "knowledge_bases": {}, "agents": {}}
+
+    def _load_state(self) -> Dict[str, Any]:
+        if not os.path.exists(self.state_path):
+            return self._empty_state()
+        try:
+            with open(self.state_path, "r") as f:
+                state = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return self._empty_state()
+        if state.get("version") != STATE_VERSION:
+            return self._empty_state()
+        return state
+
+    def _save_state(self) -> None:
+        if self.cli.dry_run:
+            return
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.state_path)
+
+    def _rel(self, path: str) -> str:
+        return os.path.relpath(path, self.root_dir)
+
+    def _list(self, subdir: str, extension: str) -> List[str]:
+        directory = os.path.join(self.root_dir, subdir)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(
+            os.path.join(directory, name)
+            for name in os.listdir(directory)
+            if name.endswith(extension) and not name.startswith(".")
+            and os.path.isfile(os.path.join(directory, name))
+        )
+
+    def validate(self) -> List[Dict[str, Any]]:
+        """
+        Validate every knowledge base manifest against disk.
+
+        Returns:
+            List of validation results (see validate_manifest) with a
+            `manifest` key holding the repository-relative manifest path
+        """
+        results = []
+        for manifest_path in self._list("knowledge_bases", ".yaml"):
+            result = validate_manifest(manifest_path)
+            result["manifest"] = self._rel(manifest_path)
+            results.append(result)
+        return results
+
+    def plan(self) -> Dict[str, Any]:
+        """
+        Compute what needs to be imported without running anything.
+
+        Returns:
+            Dictionary with tool, knowledge base, and agent deltas
+        """
+        requirements = os.path.join(self.root_dir, "tools", "requirements.txt")
+        requirements_hash = file_hash(requirements) if os.path.exists(requirements) else ""
+
+        # Shared modules (no @tool) are uploaded with every tool through the
+        # package root, so a change to one re-imports all tools.
+        tool_paths = []
+        shared_hash = requirements_hash
+        for path in self._list("tools", ".py"):
+            if is_tool_file(path):
+                tool_paths.append(path)
+            else:
+                shared_hash += file_hash(path)
+
+        tools = {self._rel(path): file_hash(path) + shared_hash for path in tool_paths}
+        agents = {self._rel(path): file_hash(path) for path in self._list("agents", ".yaml")}
+
+        knowledge_bases = []
+        for kb in self.validate():
+            previous = self.state["knowledge_bases"].get(kb["manifest"])
+            if previous is None:
+                action = "import"
+                delta = diff_entries({}, kb["documents"])
+            else:
+                delta = diff_entries(previous["documents"], kb["documents"])
+                if previous["name"] != kb["name"]:
+                    action = "reimport"
+                elif (previous["spec_hash"] != kb["spec_hash"]
+                      or delta["added"] or delta["changed"] or delta["removed"]):
+                    action = "update"
+                else:
+                    action = "none"
+            kb["action"] = action
+            kb["delta"] = delta
+            knowledge_bases.append(kb)
+
+        return {
+            "tools": tools,
+            "tools_delta": diff_entries(self.state["tools"], tools),
+            "knowledge_bases": knowledge_bases,
+            "agents": agents,
+            "agents_delta": diff_entries(self.state["agents"], agents)
+        }
+
+    def _write_upload_manifest(self, kb: Dict[str, Any], doc_paths: List[str]) -> str:
+        """
+        Write a temporary manifest next to the original listing only doc_paths.
+
+        Args:
+            kb: Validated knowledge base entry from plan()
+            doc_paths: Manifest document paths to include
+
+        Returns:
+            Path to the temporary manifest
+        """
+        manifest_path = os.path.join(self.root_dir, kb["manifest"])
+        upload = dict(kb["spec"])
+        upload["documents"] = [{"path": path} for path in doc_paths]
+
+        upload_path = os.path.join(
+            os.path.dirname(manifest_path),
+            "." + os.path.splitext(os.path.basename(manifest_path))[0] + ".upload.yaml"
+        )
+        with open(upload_path, "w") as f:
+            yaml.safe_dump(upload, f, sort_keys=False)
+        return upload_path
+
+    def verify_knowledge_base(self, kb: Dict[str, Any]) -> List[str]:
+        """
+        Compare a knowledge base's live document list with the documents on disk.
+
+        Args:
+            kb: Validated knowledge base entry (see validate)
+
+        Returns:
+            List of problems (empty when the live documents match disk)
+        """
+        output = self.cli.capture("knowledge-bases", "status", "--name", kb["name"], "--verbose")
+        if output is None:
+            return [f"could not read status of knowledge base {kb['name']}"]
+        live = parse_status_documents(output)
+        if live is None:
+            return [f"unexpected status output for knowledge base {kb['name']}"]
+
+        expected = sorted(os.path.basename(path) for path in kb["documents"])
+        problems = [f"missing from knowledge base: {name}" for name in sorted(set(expected) - set(live))]
+        problems += [f"not on disk but in knowledge base: {name}" for name in sorted(set(live) - set(expected))]
+        if not problems and len(live) != len(expected):
+            problems.append(f"{len(live)} documents in knowledge base, {len(expected)} on disk")
+        return problems
+
+    def _sync_knowledge_base(self, kb: Dict[str, Any]) -> bool:
+        if kb["action"] == "none":
+            return True
+
+        # Always the full document list: an import replaces the knowledge
+        # base's documents with exactly the ones listed.
+        doc_paths = sorted(kb["documents"])
+
+        # An import cannot empty a knowledge base, so with nothing on disk
+        # the deployed one would keep its old documents. Leave the state
+        # untouched so the next run retries.
+        if not doc_paths:
+            if kb["action"] == "import":
+                print(f"WARNING: {kb['name']}: no documents on disk, not importing")
+                return True
+            print(f"ERROR: {kb['name']}: no documents on disk but the deployed knowledge base "
+                  f"still has its previous ones; restore the documents or delete {kb['manifest']}")
+            return False
+
+        if kb["action"] == "reimport":
+            previous = self.state["knowledge_bases"][kb["manifest"]]
+            if not self.cli.run("knowledge-bases", "remove", "--name", previous["name"]):
+                return False
+
+        upload_path = self._write_upload_manifest(kb, doc_paths)
+        try:
+            ok = self.cli.run("knowledge-bases", "import", "-f", upload_path)
+        finally:
+            os.remove(upload_path)
+
+        if ok and not self.cli.dry_run:
+            problems = self.verify_knowledge_base(kb)
+            for problem in problems:
+                print(f"ERROR: {kb['name']}: {problem}")
+            ok = not problems
+
+        if ok:
+            self.state["knowledge_bases"][kb["manifest"]] = {
+                "name": kb["name"],
+                "spec_hash": kb["spec_hash"],
+                "documents": kb["documents"]
+            }
+        return ok
+
+    def sync(self) -> bool:
+        """
+        Import the delta between the tree and the last synced state.
+
+        State is saved after every successful step, so a failed run resumes
+        where it stopped.
+
+        Returns:
+            True if every required import succeeded
+        """
+        plan = self.plan()
+        ok = True
+
+        # Tools
+        tools_dir = os.path.join(self.root_dir, "tools")
+        requirements = os.path.join(tools_dir, "requirements.txt")
+        changed_tools = plan["tools_delta"]["added"] + plan["tools_delta"]["changed"]
+        for tool_path in changed_tools:
+            print(f"Importing tool: {tool_path}")
+            if self.cli.run("tools", "import", "-k", "python", "-r", requirements,
+                            "-p", tools_dir, "-f", os.path.join(self.root_dir, tool_path)):
+                self.state["tools"][tool_path] = plan["tools"][tool_path]
+                self._save_state()
+            else:
+                ok = False
+        for tool_path in plan["tools_delta"]["removed"]:
+            tool_name = os.path.splitext(os.path.basename(tool_path))[0]
+            print(f"Removing tool: {tool_name}")
+            if self.cli.run("tools", "remove", "--name", tool_name):
+                del self.state["tools"][tool_path]
+                self._save_state()
+            else:
+                ok = False
+        if changed_tools:
+            print("Removing temporary cache: tools/__pycache__")
+            pycache = os.path.join(self.root_dir, "tools", "__pycache__")
+            if not self.cli.dry_run and os.path.isdir(pycache):
+                for name in os.listdir(pycache):
+                    os.remove(os.path.join(pycache, name))
+                os.rmdir(pycache)
+
+        # Knowledge bases
+        current_manifests = set()
+        for kb in plan["knowledge_bases"]:
+            current_manifests.add(kb["manifest"])
+            for problem in kb["errors"]:
+                print(f"WARNING: {kb['manifest']}: {problem}")
+            for doc_path in kb["missing"]:
+                print(f"WARNING: {kb['manifest']}: document not found on disk: {doc_path}")
+            if kb["action"] != "none":
+                delta = kb["delta"]
+                print(f"Syncing knowledge base: {kb['name']} ({kb['action']}: "
+                      f"{len(delta['added'])} added, {len(delta['changed'])} changed, "
+                      f"{len(delta['removed'])} removed)")
+            if self._sync_knowledge_base(kb):
+                self._save_state()
+            else:
+                ok = False
+        for manifest in sorted(set(self.state["knowledge_bases"]) - current_manifests):
+            name = self.state["knowledge_bases"][manifest]["name"]
+            print(f"Removing knowledge base: {name}")
+            if self.cli.run("knowledge-bases", "remove", "--name", name):
+                del self.state["knowledge_bases"][manifest]
+                self._save_state()
+            else:
+                ok = False
+
+        # Agents (main agent last since it refers to the sub-agents)
+        changed_agents = plan["agents_delta"]["added"] + plan["agents_delta"]["changed"]
+        changed_agents.sort(key=lambda path: os.path.basename(path) == MAIN_AGENT)
+        for agent_path in changed_agents:
+            print(f"Importing agent: {agent_path}")
+            if self.cli.run("agents", "import", "-f", os.path.join(self.root_dir, agent_path)):
+                self.state["agents"][agent_path] = plan["agents"][agent_path]
+                self._save_state()
+            else:
+                ok = False
+        for agent_path in plan["agents_delta"]["removed"]:
+            agent_name = os.path.splitext(os.path.basename(agent_path))[0]
+            print(f"Removing agent: {agent_name}")
+            if self.cli.run("agents", "remove", "--name", agent_name, "--kind", "native"):
+                del self.state["agents"][agent_path]
+                self._save_state()
+            else:
+                ok = False
+
+        return ok
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Incrementally import SynthMed tools, knowledge bases, and agents into Orchestrate."
+    )
+    parser.add_argument("--state", help=f"Sync state file (default: {STATE_FILE} in the repository root)")
+    parser.add_argument("--force", action="store_true", help="Ignore the sync state and import everything")
+    parser.add_argument("--dry-run", action="store_true", help="Print orchestrate commands without running them")
+    parser.add_argument("--validate", action="store_true",
+                        help="Only validate knowledge base manifests against disk")
+    parser.add_argument("--verify", action="store_true",
+                        help="Only compare each deployed knowledge base's documents against disk")
+    args = parser.parse_args(argv)
+
+    if args.verify:
+        engine = SynthMedSync(state_path=args.state)
+        valid = True
+        for kb in engine.validate():
+            problems = engine.verify_knowledge_base(kb)
+            status = "OK" if not problems else "MISMATCH"
+            print(f"{kb['name']}: {status} ({len(kb['documents'])} documents on disk)")
+            for problem in problems:
+                print(f"  - {problem}")
+            valid = valid and not problems
+        return 0 if valid else 1
+
+    if args.validate:
+        valid = True
+        for kb in SynthMedSync(state_path=args.state).validate():
+            problems = kb["errors"] + [f"document not found on disk: {p}" for p in kb["missing"]]
+            status = "OK" if not problems else "INVALID"
+            print(f"{kb['manifest']}: {status} ({len(kb['documents'])} documents)")
+            for problem in problems:
+                print(f"  - {problem}")
+            valid = valid and not problems
+        return 0 if valid else 1
+
+    engine = SynthMedSync(state_path=args.state, cli=OrchestrateCLI(dry_run=args.dry_run), force=args.force)
+    return 0 if engine.sync() else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+# load_generator.py
+
+import os
+import sys
+import json
+import math
+import glob
+import time
+import random
+import argparse
+import threading
+import urllib.error
+import urllib.request
+from typing import Dict, List, Any, Tuple
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+QUERIES = [
+    "autism genetics de novo variants",
+    "epilepsy cognition children",
+    "dementia biomarkers",
+    "cancer metastasis signaling",
+    "rare disease diagnosis exome sequencing"
+]
+
+
+def build_requests(include_pubmed: bool) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Build the pool of simulated agent tool calls.
+
+    Args:
+        include_pubmed: Include live PubMed searches (hits NCBI rate limits)
+
+    Returns:
+        List of (tool name, arguments) pairs
+    """
+    pdfs = sorted(
+        os.path.relpath(path, ROOT_DIR)
+        for path in glob.glob(os.path.join(ROOT_DIR, "knowledge_bases", "*", "*.pdf"))
+    )
+    requests = []
+
+    for pdf_path in pdfs:
+        requests.append(("pdf_retriever", {"pdf_path": pdf_path, "include_chunks": True, "structural": True}))
+
+    for i, query in enumerate(QUERIES):
+        passages = [
+            {
+                "text": f"Passage {j} about {query}. " * 20,
+                "metadata": {"source": f"synthetic_{j}", "disease_domain": "general"}
+            }
+            for j in range(8)
+        ]
+        requests.append(("llm_synthesizer", {
+            "query": query,
+            "context": json.dumps(passages),
+            "output_format": "summary",
+            "compress": i % 2 == 0
+        }))
+        if include_pubmed:
+            requests.append(("pubmed_search", {"query": query, "max_results": 5}))
+
+    return requests
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a sorted list."""
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(values)))
+    return values[rank - 1]
+
+
+def run_agent(base_url: str,
+              requests: List[Tuple[str, Dict[str, Any]]],
+              deadline: float,
+              seed: int,
+              results: List[Tuple[str, float, int]],
+              lock: threading.Lock) -> None:
+    """Issue tool calls back to back until the deadline, like one busy agent."""
+    rng = random.Random(seed)
+    local = []
+
+    while time.time() < deadline:
+        tool_name, args = rng.choice(requests)
+        body = json.dumps(args).encode("utf-8")
+        request = urllib.request.Request(
+            f"{base_url}/{tool_name}", data=body, headers={"Content-Type": "application/json"}
+        )
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=600) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            status = e.code
+        except (urllib.error.URLError, OSError):
+            status = 0
+        local.append((tool_name, time.perf_counter() - started, status))
+
+        if status == 503:
+            time.sleep(0.05)
+
+    with lock:
+        results.extend(local)
+
+
+def report(results: List[Tuple[str, float, int]], elapsed: float) -> None:
+    """Print latency percentiles and throughput overall and per tool."""
+    def line(label: str, rows: List[Tuple[str, float, int]]):
+        ok = sorted(latency for _, latency, status in rows if status == 200)
+        rejected = sum(1 for _, _, status in rows if status == 503)
+        failed = len(rows) - len(ok) - rejected
+        print(f"{label:<28} {len(ok):>7} {rejected:>6} {failed:>6} "
+              f"{len(ok) / elapsed:>8.1f} "
+              f"{percentile(ok, 50) * 1000:>9.1f} {percentile(ok, 95) * 1000:>9.1f} "
+              f"{percentile(ok, 99) * 1000:>9.1f}")
+
+    print(f"{'tool':<28} {'ok':>7} {'503':>6} {'errors':>6} {'req/s':>8} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for tool_name in sorted({row[0] for row in results}):
+        line(tool_name, [row for row in results if row[0] == tool_name])
+    line("all", results)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Drive the SynthMed tool server with N concurrent simulated agents."
+    )
+    parser.add_argument("--url", default="http://127.0.0.1:8765", help="Tool server base URL")
+    parser.add_argument("--agents", type=int, default=8, help="Concurrent simulated agents")
+    parser.add_argument("--duration", type=float, default=30.0, help="Test duration in seconds")
+    parser.add_argument("--pubmed", action="store_true", help="Include live PubMed searches")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    requests = build_requests(args.pubmed)
+    if not requests:
+        print("No requests to send (no knowledge base PDFs found)")
+        return 1
+
+    results: List[Tuple[str, float, int]] = []
+    lock = threading.Lock()
+    started = time.time()
+    deadline = started + args.duration
+
+    threads = [
+        threading.Thread(target=run_agent, args=(args.url.rstrip("/"), requests, deadline,
+                                                 args.seed + i, results, lock))
+        for i in range(args.agents)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    elapsed = time.time() - started
+    print(f"{args.agents} agents, {elapsed:.1f}s")
+    report(results, elapsed)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
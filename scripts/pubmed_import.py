@@ -0,0 +1,165 @@
+# pubmed_import.py
+
+import os
+import sys
+import glob
+import gzip
+import json
+import time
+import argparse
+from multiprocessing import Pool
+from typing import Dict, List, Any, Optional, Tuple
+from xml.etree import ElementTree as ET
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
+
+from pubmed_search import PubMedSearcher, open_article_store  # noqa: E402
+
+
+def parse_dump(path: str) -> Tuple[str, List[Tuple], List[str]]:
+    """
+    Stream one PubMed baseline/update file and extract its articles.
+
+    Articles go through PubMedSearcher._parse_article, so fields match what
+    the E-utilities client returns. XML elements are cleared as soon as they
+    are parsed, so the document tree never builds up; the extracted rows are
+    still collected in memory, so memory grows with the file's article count
+    (about 30,000 articles per baseline file).
+
+    Args:
+        path: Path to a pubmed*.xml.gz (or uncompressed .xml) file
+
+    Returns:
+        Tuple of (path, article rows, PMIDs listed under DeleteCitation)
+    """
+    searcher = PubMedSearcher()
+    rows = []
+    deleted = []
+
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        context = ET.iterparse(f, events=("start", "end"))
+        _, root = next(context)
+
+        for event, elem in context:
+            if event != "end":
+                continue
+
+            if elem.tag == "PubmedArticle":
+                article = searcher._parse_article(elem)
+                if article and article["pmid"] != "Unknown":
+                    rows.append((
+                        article["pmid"],
+                        article["title"],
+                        article["abstract"],
+                        json.dumps(article["authors"]),
+                        article["journal"],
+                        article["year"],
+                        article["doi"],
+                        article["citation"]
+                    ))
+                root.clear()
+
+            elif elem.tag == "DeleteCitation":
+                deleted.extend(pmid.text for pmid in elem.findall("PMID") if pmid.text)
+                root.clear()
+
+    return path, rows, deleted
+
+
+def write_rows(conn, rows: List[Tuple], deleted: List[str]) -> None:
+    """
+    Apply one file's articles and deletions to the store in a transaction.
+
+    Re-published PMIDs replace the stored article (update files carry
+    revised records), going through DELETE so the FTS index stays in sync.
+    Within the file, the last record for a PMID is kept.
+
+    Args:
+        conn: Article store connection
+        rows: Article rows from parse_dump
+        deleted: PMIDs to remove
+    """
+    # A PMID can repeat within one file (versioned or revised citations);
+    # the last occurrence wins
+    rows = list({row[0]: row for row in rows}.values())
+
+    with conn:
+        conn.executemany("DELETE FROM articles WHERE pmid = ?", [(row[0],) for row in rows])
+        conn.executemany("DELETE FROM articles WHERE pmid = ?", [(pmid,) for pmid in deleted])
+        conn.executemany(
+            "INSERT INTO articles (pmid, title, abstract, authors, journal, year, doi, citation) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            rows
+        )
+
+
+def import_dumps(paths: List[str], db_path: str, processes: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Import PubMed dump files into a local article store.
+
+    Files are parsed in parallel by a process pool; results are applied by
+    this process in file order so later update files win over earlier ones.
+
+    Args:
+        paths: Dump files, in baseline/update order
+        db_path: Path to the SQLite article store (created if missing)
+        processes: Worker processes (default: CPU count)
+
+    Returns:
+        Import statistics
+    """
+    conn = open_article_store(db_path, create=True)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+
+    stats = {"files": 0, "articles": 0, "deleted": 0}
+    started = time.time()
+
+    with Pool(processes=processes) as pool:
+        for path, rows, deleted in pool.imap(parse_dump, paths):
+            write_rows(conn, rows, deleted)
+            stats["files"] += 1
+            stats["articles"] += len(rows)
+            stats["deleted"] += len(deleted)
+            print(f"{os.path.basename(path)}: {len(rows)} articles, {len(deleted)} deletions")
+
+    with conn:
+        conn.execute("INSERT INTO articles_fts(articles_fts) VALUES ('optimize')")
+    stats["total_articles"] = conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+    stats["seconds"] = round(time.time() - started, 1)
+    conn.close()
+
+    return stats
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Import PubMed baseline/update XML dumps into a local searchable article store."
+    )
+    parser.add_argument("inputs", nargs="+", help="pubmed*.xml.gz files or directories containing them")
+    parser.add_argument("--db", default=os.environ.get("SYNTHMED_PUBMED_DB", "pubmed.sqlite"),
+                        help="Article store path (default: SYNTHMED_PUBMED_DB or pubmed.sqlite)")
+    parser.add_argument("--processes", type=int, default=None, help="Parser processes (default: CPU count)")
+    args = parser.parse_args()
+
+    paths = []
+    for item in args.inputs:
+        if os.path.isdir(item):
+            paths.extend(glob.glob(os.path.join(item, "*.xml.gz")))
+        else:
+            paths.append(item)
+    # Baseline and update files are numbered; name order is application order
+    paths.sort(key=os.path.basename)
+
+    if not paths:
+        print("No PubMed dump files found")
+        return 1
+
+    stats = import_dumps(paths, args.db, processes=args.processes)
+    print(json.dumps(stats, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,378 @@
+# tool_server.py
+
+import os
+import sys
+import json
+import time
+import queue
+import typing
+import inspect
+import argparse
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Callable, Optional, Tuple, Union
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
+
+from pdf_retriever import resolve_pdf_path, extract_pdf_text, extract_pdf_structure, retrieve_pdf  # noqa: E402
+from pubmed_search import PubMedSearcher, create_searcher, search_pubmed  # noqa: E402
+from llm_synthesizer import (  # noqa: E402
+    MedicalSynthesizer, ExtractiveCompressor, synthesize_context, synthesize_research
+)
+from synthmed_model import dump_result, load_json  # noqa: E402
+
+
+class Overloaded(Exception):
+    """Raised when the work queue is full."""
+
+
+class WarmState:
+    """
+    State kept alive between requests: parsed PDFs, PubMed HTTP sessions,
+    and initialized LLM backends.
+    """
+
+    def __init__(self, pdf_cache_size: int = 64):
+        """
+        Initialize warm state.
+
+        Args:
+            pdf_cache_size: Number of extracted PDFs kept in memory
+        """
+        self.pdf_cache_size = pdf_cache_size
+        self._pdf_cache: "OrderedDict[Tuple[str, float, bool], Dict[str, Any]]" = OrderedDict()
+        self._pdf_lock = threading.Lock()
+        self._local = threading.local()
+
+        # Backends are created once (credential setup, health checks) and
+        # shared by both synthesizer variants.
+        self.synthesizer = MedicalSynthesizer()
+        self.compressing_synthesizer = MedicalSynthesizer(
+            preprocessor=ExtractiveCompressor(),
+            backends=self.synthesizer.backends,
+            routing=self.synthesizer.routing
+        )
+
+        self.stats = {"pdf_cache_hits": 0, "pdf_cache_misses": 0}
+
+    def searcher(self) -> PubMedSearcher:
+        """
+        Return this worker thread's PubMed client (pooled session or store
+        connection). Clients share one process-wide NCBI rate limiter, so
+        adding workers does not raise the request rate.
+        """
+        searcher = getattr(self._local, "searcher", None)
+        if searcher is None:
+            searcher = self._local.searcher = create_searcher()
+        return searcher
+
+    def extract_pdf(self, pdf_path: str, structural: bool) -> Dict[str, Any]:
+        """
+        Extract a PDF, reusing the cached result while the file is unchanged.
+
+        Args:
+            pdf_path: Path to the PDF file (relative or absolute)
+            structural: Use section-aware extraction
+
+        Returns:
+            Extraction result (shared; callers must not mutate it)
+        """
+        pdf_path = resolve_pdf_path(pdf_path)
+        try:
+            mtime = os.path.getmtime(pdf_path)
+        except OSError:
+            return {"error": f"PDF file not found: {pdf_path}"}
+
+        key = (pdf_path, mtime, structural)
+        with self._pdf_lock:
+            result = self._pdf_cache.get(key)
+            if result is not None:
+                self._pdf_cache.move_to_end(key)
+                self.stats["pdf_cache_hits"] += 1
+                return result
+            self.stats["pdf_cache_misses"] += 1
+
+        result = extract_pdf_structure(pdf_path) if structural else extract_pdf_text(pdf_path)
+
+        if "error" not in result:
+            with self._pdf_lock:
+                self._pdf_cache[key] = result
+                while len(self._pdf_cache) > self.pdf_cache_size:
+                    self._pdf_cache.popitem(last=False)
+
+        return result
+
+
+def handle_pdf_retriever(state: WarmState, args: Dict[str, Any]) -> Dict[str, Any]:
+    return retrieve_pdf(extract=state.extract_pdf, **args)
+
+
+def handle_pubmed_search(state: WarmState, args: Dict[str, Any]) -> Dict[str, Any]:
+    return search_pubmed(make_searcher=state.searcher, **args)
+
+
+def _synthesizer(state: WarmState, args: Dict[str, Any]) -> MedicalSynthesizer:
+    return state.compressing_synthesizer if args["compress"] else state.synthesizer
+
+
+def handle_llm_synthesizer(state: WarmState, args: Dict[str, Any]) -> Dict[str, Any]:
+    return synthesize_context(synthesizer=_synthesizer(state, args), **args)
+
+
+def handle_synthesize_research_query(state: WarmState, args: Dict[str, Any]) -> Dict[str, Any]:
+    return synthesize_research(synthesizer=_synthesizer(state, args), **args)
+
+
+# Tool name -> (handler, shared tool function whose parameters, minus the
+# injected warm-state one, are the tool's arguments).
+Handler = Callable[[WarmState, Dict[str, Any]], Dict[str, Any]]
+
+HANDLERS: Dict[str, Tuple[Handler, Callable[..., Dict[str, Any]], str]] = {
+    "pdf_retriever": (handle_pdf_retriever, retrieve_pdf, "extract"),
+    "pubmed_search": (handle_pubmed_search, search_pubmed, "make_searcher"),
+    "llm_synthesizer": (handle_llm_synthesizer, synthesize_context, "synthesizer"),
+    "synthesize_research_query": (handle_synthesize_research_query, synthesize_research, "synthesizer")
+}
+
+
+def _accepts(value: Any, annotation: Any) -> bool:
+    if typing.get_origin(annotation) is Union:
+        return any(_accepts(value, arg) for arg in typing.get_args(annotation))
+    if annotation is bool:
+        return isinstance(value, bool)
+    if annotation is int:
+        return isinstance(value, int) and not isinstance(value, bool)
+    if annotation is str:
+        return isinstance(value, str)
+    if annotation is type(None):
+        return value is None
+    return True
+
+
+def validate_args(tool_name: str, args: Any) -> Tuple[Dict[str, Any], bool]:
+    """
+    Check a request body against the tool's parameters and fill in defaults.
+
+    Args:
+        tool_name: Key in HANDLERS
+        args: Decoded request body
+
+    Returns:
+        (arguments for the handler, compact flag for the response)
+
+    Raises:
+        ValueError: On a missing, unknown, or mistyped argument
+    """
+    if not isinstance(args, dict):
+        raise ValueError("Request body must be a JSON object")
+
+    _, function, injected = HANDLERS[tool_name]
+    parameters = {
+        name: param for name, param in inspect.signature(function).parameters.items() if name != injected
+    }
+    # compact only selects the response format
+    allowed = set(parameters) | {"compact"}
+
+    unknown = sorted(set(args) - allowed)
+    if unknown:
+        raise ValueError(f"Unknown argument(s): {', '.join(unknown)}")
+
+    validated = {}
+    for name, param in parameters.items():
+        if name not in args:
+            if param.default is inspect.Parameter.empty:
+                raise ValueError(f"Missing argument: {name}")
+            validated[name] = param.default
+            continue
+        value = args[name]
+        if not (_accepts(value, param.annotation) or (value is None and param.default is None)):
+            raise ValueError(f"Invalid value for {name}: {value!r}")
+        validated[name] = value
+
+    compact = args.get("compact", False)
+    if not isinstance(compact, bool):
+        raise ValueError(f"Invalid value for compact: {compact!r}")
+    return validated, compact
+
+
+class WorkerPool:
+    """
+    Fixed pool of worker threads fed from a bounded queue.
+
+    submit() fails fast with Overloaded when the queue is full, so callers
+    get backpressure instead of unbounded queueing latency.
+    """
+
+    def __init__(self, state: WarmState, workers: int = 4, queue_size: int = 32):
+        """
+        Start the worker threads.
+
+        Args:
+            state: Warm state shared by all workers
+            workers: Number of worker threads
+            queue_size: Maximum number of queued (not yet running) requests
+        """
+        self.state = state
+        self.queue: "queue.Queue[Optional[Tuple[str, Dict[str, Any], Future]]]" = queue.Queue(maxsize=queue_size)
+        self.threads = [
+            threading.Thread(target=self._run, name=f"tool-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        self.completed = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, tool_name: str, args: Dict[str, Any]) -> Future:
+        """
+        Queue a tool call.
+
+        Args:
+            tool_name: Key in HANDLERS
+            args: Tool arguments
+
+        Returns:
+            Future resolving to the tool result
+        """
+        future = Future()
+        try:
+            self.queue.put_nowait((tool_name, args, future))
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise Overloaded()
+        return future
+
+    def _run(self) -> None:
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            tool_name, args, future = item
+            if future.set_running_or_notify_cancel():
+                try:
+                    handler = HANDLERS[tool_name][0]
+                    future.set_result(handler(self.state, args))
+                except Exception as e:
+                    future.set_exception(e)
+            with self._lock:
+                self.completed += 1
+
+    def shutdown(self) -> None:
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+
+
+def make_handler(pool: WorkerPool, request_timeout: float):
+    class ToolRequestHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None,
+                  compact: bool = True):
+            body = dump_result(payload, compact=compact).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, {"status": "ok"})
+            elif self.path == "/stats":
+                self._send(200, {
+                    "queued": pool.queue.qsize(),
+                    "queue_size": pool.queue.maxsize,
+                    "workers": len(pool.threads),
+                    "completed": pool.completed,
+                    "rejected": pool.rejected,
+                    **pool.state.stats
+                })
+            else:
+                self._send(404, {"error": f"Unknown path: {self.path}"})
+
+        def do_POST(self):
+            tool_name = self.path.strip("/")
+            if tool_name not in HANDLERS:
+                self._send(404, {"error": f"Unknown tool: {tool_name}"})
+                return
+
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                args = load_json(self.rfile.read(length) or b"{}")
+            except (ValueError, json.JSONDecodeError) as e:
+                self._send(400, {"error": f"Invalid JSON body: {str(e)}"})
+                return
+
+            try:
+                args, compact = validate_args(tool_name, args)
+            except ValueError as e:
+                self._send(400, {"error": str(e)})
+                return
+
+            try:
+                future = pool.submit(tool_name, args)
+            except Overloaded:
+                self._send(503, {"error": "Server busy, retry later"}, {"Retry-After": "1"})
+                return
+
+            try:
+                result = future.result(timeout=request_timeout)
+            except FutureTimeout:
+                # A queued job is dropped; a running one cannot be interrupted
+                # and finishes in the background.
+                future.cancel()
+                self._send(504, {"error": f"{tool_name} timed out after {request_timeout:g}s"})
+                return
+            except Exception as e:
+                self._send(500, {"error": f"{tool_name} failed: {str(e)}"})
+                return
+
+            self._send(200, result, compact=compact)
+
+    return ToolRequestHandler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Serve the SynthMed tools over local HTTP with warm state and a bounded worker pool."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=4, help="Worker threads")
+    parser.add_argument("--queue-size", type=int, default=32,
+                        help="Queued requests before new ones get 503")
+    parser.add_argument("--pdf-cache", type=int, default=64, help="Extracted PDFs kept in memory")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-request timeout in seconds")
+    args = parser.parse_args()
+
+    state = WarmState(pdf_cache_size=args.pdf_cache)
+    pool = WorkerPool(state, workers=args.workers, queue_size=args.queue_size)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(pool, args.timeout))
+    server.daemon_threads = True
+
+    print(f"SynthMed tool server on http://{args.host}:{args.port} "
+          f"({args.workers} workers, queue {args.queue_size})")
+    started = time.time()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pool.shutdown()
+        print(f"Served {pool.completed} requests in {time.time() - started:.0f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+#!/usr/bin/env bash
+set -x
+
+orchestrate env activate synthmed
+SCRIPT_DIR=$( cd -- "$( dirname -- "${BASH_SOURCE[0]}" )" &> /dev/null && pwd )
+
+# Import only the tools, knowledge base documents, and agents that changed
+# since the last sync (state kept in .synthmed_sync_state.json).
+python3 ${SCRIPT_DIR}/scripts/kb_sync.py "$@"
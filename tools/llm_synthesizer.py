@@ -1,24 +1,408 @@
 # llm_synthesizer.py
 
 import os
+import re
 import json
-from typing import List, Dict, Any, Optional
+import math
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Callable, Tuple, Iterator, Union
+import requests
 from ibm_watsonx_orchestrate.agent_builder.tools import tool
+from synthmed_model import Passage, Article, Citation, to_passages, dump_result, load_json
 
 
-class MedicalSynthesizer:
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\[(])|\n{2,}")
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9\-]*")
+STOPWORDS = frozenset("""
+a an and are as at be been but by can could did do does for from had has have how
+in into is it its may might more most not of on or our such than that the their
+them then there these they this those to was we were what when where which while
+who whom why will with within without would you your also between both each
+""".split())
+
+
+def _tokenize(text: str) -> List[str]:
+    """Lowercase content-word tokens used for sentence scoring."""
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS and len(t) > 1]
+
+
+class ExtractiveCompressor:
     """
-    Medical research synthesizer using IBM watsonx.ai.
+    CPU-only extractive pre-summarization of retrieved passages.
+
+    Each passage is cut down to its most query-relevant sentences under a
+    per-passage character budget. Sentences are scored by query-term overlap
+    plus TF-IDF centrality within the passage and kept in their original
+    order. Passages keep their position and metadata, so the [Source N]
+    numbering used in the prompt and the citation list still line up.
     """
 
-    def __init__(self, model_id: str = "meta-llama/llama-3-2-90b-vision-instruct"):
+    def __init__(self, max_chars: int = 600, query_weight: float = 2.0):
         """
-        Initialize the synthesizer.
+        Initialize the compressor.
 
         Args:
-            model_id: IBM watsonx.ai model ID to use
+            max_chars: Character budget per passage
+            query_weight: Weight of query-term overlap relative to centrality
+        """
+        self.max_chars = max_chars
+        self.query_weight = query_weight
+
+    def compress_text(self, query_terms: Counter, text: str) -> str:
+        """
+        Compress a single passage text.
+
+        Args:
+            query_terms: Token counts of the query
+            text: Passage text
+
+        Returns:
+            Selected sentences joined in original order
+        """
+        if len(text) <= self.max_chars:
+            return text
+
+        sentences = [s.strip() for s in SENTENCE_SPLIT.split(text) if s and s.strip()]
+        if len(sentences) <= 1:
+            return self._truncate(text)
+
+        sentence_tokens = [Counter(_tokenize(s)) for s in sentences]
+
+        # Sentence-level document frequency for TF-IDF weights
+        df = Counter()
+        for tokens in sentence_tokens:
+            df.update(tokens.keys())
+        n = len(sentences)
+        idf = {t: math.log((n + 1) / (count + 1)) + 1.0 for t, count in df.items()}
+
+        centroid = Counter()
+        vectors = []
+        for tokens in sentence_tokens:
+            vector = {t: c * idf[t] for t, c in tokens.items()}
+            vectors.append(vector)
+            centroid.update(vector)
+        centroid_norm = math.sqrt(sum(v * v for v in centroid.values())) or 1.0
+
+        query_weight_total = sum(idf.get(t, 1.0) for t in query_terms) or 1.0
+
+        scores = []
+        for i, vector in enumerate(vectors):
+            norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+            centrality = sum(w * centroid[t] for t, w in vector.items()) / (norm * centroid_norm)
+            overlap = sum(idf.get(t, 1.0) for t in query_terms if t in vector) / query_weight_total
+            scores.append((self.query_weight * overlap + centrality, -i))
+
+        ranked = sorted(scores, reverse=True)
+        selected = []
+        used = 0
+        for _, neg_index in ranked:
+            sentence = sentences[-neg_index]
+            # used counts one separator per selected sentence, one more than the join adds
+            if used + len(sentence) > self.max_chars:
+                continue
+            selected.append(-neg_index)
+            used += len(sentence) + 1
+            if used >= self.max_chars:
+                break
+
+        if not selected:
+            # Every sentence is over budget (common in PDF text the splitter
+            # finds no boundaries in): cut down the best-ranked one
+            return self._truncate(sentences[-ranked[0][1]])
+
+        return " ".join(sentences[i] for i in sorted(selected))
+
+    def _truncate(self, text: str) -> str:
+        """Cut text to the character budget, at a word boundary when there is one."""
+        if len(text) <= self.max_chars:
+            return text
+        cut = text[:self.max_chars]
+        head, space, _ = cut.rpartition(" ")
+        return head if space and head else cut
+
+    def __call__(self,
+                 query: str,
+                 passages: List[Passage]) -> Tuple[List[Passage], Dict[str, Any]]:
+        """
+        Compress retrieved passages for a query.
+
+        Args:
+            query: Research question
+            passages: Retrieved passages (Passage objects or dictionaries)
+
+        Returns:
+            Tuple of (compressed passages, compression statistics)
+        """
+        query_terms = Counter(_tokenize(query))
+
+        compressed = []
+        original_chars = 0
+        compressed_chars = 0
+
+        for passage in to_passages(passages):
+            text = passage.text
+            short = self.compress_text(query_terms, text)
+            original_chars += len(text)
+            compressed_chars += len(short)
+            compressed.append(passage.with_text(short))
+
+        stats = {
+            "method": "extractive",
+            "max_chars_per_passage": self.max_chars,
+            "original_chars": original_chars,
+            "compressed_chars": compressed_chars,
+            "compression_ratio": round(compressed_chars / original_chars, 3) if original_chars else 1.0
+        }
+
+        return compressed, stats
+
+
+DEFAULT_MODEL_ID = "meta-llama/llama-3-2-90b-vision-instruct"
+
+DEFAULT_PARAMETERS = {
+    "max_new_tokens": 2000,
+    "temperature": 0.7,
+    "top_p": 0.9,
+    "top_k": 50
+}
+
+# Which backend serves each output_format ("*" is the default). Cheap
+# formats go to the local model when one is configured; anything else, or
+# an unavailable backend, falls through to whichever backend is available.
+# Override with SYNTHMED_LLM_ROUTING, e.g. "*=local" for air-gapped use.
+DEFAULT_ROUTING = {
+    "*": "watsonx",
+    "summary": "local"
+}
+
+
+PROMPT_HEADER = """You are a medical research synthesis expert. Analyze the following research question and context to generate a comprehensive, accurate synthesis.
+
+Research Question:
+"""
+
+PROMPT_CONTEXT_HEADER = """
+
+Context from Medical Literature:
+"""
+
+PROMPT_REQUIREMENTS = """
+
+Requirements:
+- Synthesize information across all sources
+- Maintain scientific rigor and accuracy
+- Use proper citations [Source X]
+- Identify areas of consensus and disagreement
+- Note confidence levels and evidence quality
+- Avoid making clinical recommendations
+
+Synthesis:"""
+
+FORMAT_INSTRUCTIONS = {
+    "comprehensive": """
+Generate a comprehensive research synthesis with:
+1. Executive Summary (2-3 sentences)
+2. Detailed Synthesis (organized by key themes)
+3. Key Findings (bullet points)
+4. Cross-Domain Connections (if applicable)
+5. References (numbered list)
+""",
+    "summary": """
+Generate a concise summary (3-5 sentences) that:
+- Answers the research question directly
+- Highlights the most important findings
+- Maintains scientific accuracy
+""",
+    "table": """
+Generate a structured table format with:
+- Disease Domain | Key Finding | Source | Confidence
+- Organize findings by domain
+- Include citations
+"""
+}
+
+CONTEXT_SEPARATOR = "\n---\n"
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate token count at ~4 characters per token (no tokenizer call)."""
+    return (len(text) + 3) // 4
+
+
+def _context_pieces(passages: List[Passage], pieces: List[str]) -> None:
+    """
+    Append the context for passages to pieces so the caller can join it in one pass.
+
+    Args:
+        passages: List of passages
+        pieces: List the context fragments are appended to
+    """
+    append = pieces.append
+    separator = ""
+
+    for i, passage in enumerate(passages, 1):
+        source = passage.source if passage.source is not None else "Unknown source"
+        domain = passage.disease_domain if passage.disease_domain is not None else "general"
+        append(f"{separator}[Source {i}: {source}, Domain: {domain}]\n")
+        append(passage.text or "")
+        append("\n")
+        separator = CONTEXT_SEPARATOR
+
+
+class PromptTemplate:
+    """
+    Synthesis prompt precompiled for one output format.
+
+    Everything except the query and the context is joined once at
+    construction, so rendering is a single str.join over the static parts
+    and the passage fragments. The token count of the rendered prompt is
+    computed once and returned with it.
+    """
+
+    def __init__(self, output_format: str):
         """
+        Compile the template.
+
+        Args:
+            output_format: Output format (comprehensive, summary, table;
+                anything else renders as table)
+        """
+        if output_format not in FORMAT_INSTRUCTIONS:
+            output_format = "table"
+        self.output_format = output_format
+
+        self.prefix = PROMPT_HEADER
+        self.middle = PROMPT_CONTEXT_HEADER
+        self.suffix = "\n\nInstructions:\n" + FORMAT_INSTRUCTIONS[output_format] + PROMPT_REQUIREMENTS
+
+    def render(self,
+               query: str,
+               passages: List[Passage],
+               token_counter: Callable[[str], int] = estimate_tokens) -> Tuple[str, int]:
+        """
+        Render the prompt for a query and retrieved passages.
+
+        Args:
+            query: Research question
+            passages: List of passages (see to_passages)
+            token_counter: Token counting function for the target model,
+                e.g. LLMBackend.token_count
+
+        Returns:
+            Tuple of (prompt string, prompt token count)
+        """
+        pieces = [self.prefix, query, self.middle]
+        _context_pieces(passages, pieces)
+        pieces.append(self.suffix)
+
+        prompt = "".join(pieces)
+        return prompt, token_counter(prompt)
+
+
+_TEMPLATE_CACHE: Dict[str, PromptTemplate] = {}
+
+
+def get_prompt_template(output_format: str) -> PromptTemplate:
+    """
+    Return the compiled template for an output format, compiling it on first
+    use. Unknown formats share the table template.
+
+    Args:
+        output_format: Output format (comprehensive, summary, table)
+
+    Returns:
+        Cached PromptTemplate
+    """
+    if output_format not in FORMAT_INSTRUCTIONS:
+        output_format = "table"
+    template = _TEMPLATE_CACHE.get(output_format)
+    if template is None:
+        template = _TEMPLATE_CACHE[output_format] = PromptTemplate(output_format)
+    return template
+
+
+class LLMBackend:
+    """
+    Interface for text generation backends used by MedicalSynthesizer.
+    """
+
+    name = "base"
+
+    def __init__(self, model_id: str):
         self.model_id = model_id
+        self.available = False
+
+    def generate(self, prompt: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Generate a completion for a prompt.
+
+        Args:
+            prompt: Input prompt
+            params: Generation parameters (see DEFAULT_PARAMETERS)
+
+        Returns:
+            Generated text
+        """
+        raise NotImplementedError
+
+    def generate_stream(self, prompt: str, params: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """
+        Generate a completion as a stream of text fragments.
+
+        Args:
+            prompt: Input prompt
+            params: Generation parameters
+
+        Returns:
+            Iterator of generated text fragments
+        """
+        yield self.generate(prompt, params)
+
+    def generate_batch(self, prompts: List[str], params: Optional[Dict[str, Any]] = None) -> List[str]:
+        """
+        Generate completions for several prompts.
+
+        Args:
+            prompts: Input prompts
+            params: Generation parameters
+
+        Returns:
+            Generated texts in prompt order
+        """
+        return [self.generate(prompt, params) for prompt in prompts]
+
+    def token_count(self, text: str) -> int:
+        """
+        Count tokens in text. The base implementation estimates ~4 characters
+        per token; backends with a tokenizer endpoint override it.
+
+        Args:
+            text: Input text
+
+        Returns:
+            Number of tokens
+        """
+        return estimate_tokens(text)
+
+
+class WatsonxBackend(LLMBackend):
+    """
+    IBM watsonx.ai backend (ibm_watsonx_ai ModelInference).
+    """
+
+    name = "watsonx"
+
+    def __init__(self, model_id: str = DEFAULT_MODEL_ID, url: Optional[str] = None):
+        """
+        Initialize the watsonx.ai backend from WATSONX_* environment variables.
+
+        Args:
+            model_id: IBM watsonx.ai model ID to use
+            url: watsonx.ai endpoint (default: WATSONX_URL or us-south)
+        """
+        super().__init__(model_id)
+        self.url = url or os.environ.get("WATSONX_URL", "https://us-south.ml.cloud.ibm.com")
 
         # Try to import IBM watsonx.ai SDK
         try:
@@ -31,7 +415,7 @@ class MedicalSynthesizer:
 
             if api_key and project_id:
                 credentials = Credentials(
-                    url="https://us-south.ml.cloud.ibm.com",
+                    url=self.url,
                     api_key=api_key
                 )
                 self.client = APIClient(credentials)
@@ -40,224 +424,291 @@ class MedicalSynthesizer:
                     credentials=credentials,
                     project_id=project_id
                 )
-                self.watsonx_available = True
-            else:
-                self.watsonx_available = False
+                self.available = True
 
         except ImportError:
-            self.watsonx_available = False
+            self.available = False
 
-    def synthesize_with_context(self,
-                                 query: str,
-                                 retrieved_passages: List[Dict[str, Any]],
-                                 output_format: str = "comprehensive") -> Dict[str, Any]:
-        """
-        Synthesize information from multiple retrieved passages.
+    def generate(self, prompt: str, params: Optional[Dict[str, Any]] = None) -> str:
+        return self.model.generate_text(prompt=prompt, params=params or DEFAULT_PARAMETERS)
 
-        Args:
-            query: Research question or query
-            retrieved_passages: List of relevant passages with metadata
-            output_format: Output format (comprehensive, summary, table)
+    def generate_stream(self, prompt: str, params: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        return self.model.generate_text_stream(prompt=prompt, params=params or DEFAULT_PARAMETERS)
 
-        Returns:
-            Dictionary with synthesized content
-        """
-        # Build context from retrieved passages
-        context = self._build_context(retrieved_passages)
+    def generate_batch(self, prompts: List[str], params: Optional[Dict[str, Any]] = None) -> List[str]:
+        # ModelInference fans a list of prompts out concurrently itself
+        return self.model.generate_text(prompt=prompts, params=params or DEFAULT_PARAMETERS)
 
-        # Create synthesis prompt
-        prompt = self._create_synthesis_prompt(query, context, output_format)
+    def token_count(self, text: str) -> int:
+        try:
+            return self.model.tokenize(prompt=text)["result"]["token_count"]
+        except Exception:
+            return super().token_count(text)
 
-        # Generate synthesis
-        if self.watsonx_available:
-            synthesis = self._generate_with_watsonx(prompt)
-        else:
-            synthesis = self._generate_fallback(prompt, context)
 
-        # Extract citations from passages
-        citations = self._extract_citations(retrieved_passages)
+class LocalBackend(LLMBackend):
+    """
+    Local CPU backend for small quantized models behind a llama.cpp-compatible
+    HTTP server (llama-server / llama-cpp-python server) on localhost.
+    """
 
+    name = "local"
+
+    def __init__(self,
+                 url: Optional[str] = None,
+                 model_id: Optional[str] = None,
+                 timeout: float = 120.0,
+                 max_workers: int = 4):
+        """
+        Initialize the local backend.
+
+        Args:
+            url: Server base URL (default: SYNTHMED_LOCAL_LLM_URL or http://127.0.0.1:8080)
+            model_id: Label reported in results (default: SYNTHMED_LOCAL_LLM_MODEL)
+            timeout: Request timeout in seconds
+            max_workers: Concurrent requests for generate_batch (match the
+                server's --parallel slots)
+        """
+        super().__init__(model_id or os.environ.get("SYNTHMED_LOCAL_LLM_MODEL", "local-gguf"))
+        self.url = (url or os.environ.get("SYNTHMED_LOCAL_LLM_URL", "http://127.0.0.1:8080")).rstrip("/")
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.session = requests.Session()
+
+        try:
+            response = self.session.get(f"{self.url}/health", timeout=2)
+            self.available = response.status_code == 200
+        except requests.RequestException:
+            self.available = False
+
+    def _payload(self, prompt: str, params: Optional[Dict[str, Any]], stream: bool) -> Dict[str, Any]:
+        params = params or DEFAULT_PARAMETERS
         return {
-            "query": query,
-            "synthesis": synthesis,
-            "citations": citations,
-            "source_count": len(retrieved_passages),
-            "model": self.model_id if self.watsonx_available else "fallback"
+            "prompt": prompt,
+            "n_predict": params.get("max_new_tokens", DEFAULT_PARAMETERS["max_new_tokens"]),
+            "temperature": params.get("temperature", DEFAULT_PARAMETERS["temperature"]),
+            "top_p": params.get("top_p", DEFAULT_PARAMETERS["top_p"]),
+            "top_k": params.get("top_k", DEFAULT_PARAMETERS["top_k"]),
+            "stream": stream
         }
 
-    def _build_context(self, passages: List[Dict[str, Any]]) -> str:
+    def generate(self, prompt: str, params: Optional[Dict[str, Any]] = None) -> str:
+        response = self.session.post(f"{self.url}/completion",
+                                     json=self._payload(prompt, params, False),
+                                     timeout=self.timeout)
+        response.raise_for_status()
+        return response.json().get("content", "")
+
+    def generate_stream(self, prompt: str, params: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        with self.session.post(f"{self.url}/completion",
+                               json=self._payload(prompt, params, True),
+                               timeout=self.timeout,
+                               stream=True) as response:
+            response.raise_for_status()
+            # Server-sent events: one "data: {...}" line per fragment
+            for line in response.iter_lines():
+                if not line.startswith(b"data: "):
+                    continue
+                event = json.loads(line[6:])
+                if event.get("content"):
+                    yield event["content"]
+                if event.get("stop"):
+                    break
+
+    def generate_batch(self, prompts: List[str], params: Optional[Dict[str, Any]] = None) -> List[str]:
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(lambda prompt: self.generate(prompt, params), prompts))
+
+    def token_count(self, text: str) -> int:
+        try:
+            response = self.session.post(f"{self.url}/tokenize", json={"content": text}, timeout=self.timeout)
+            response.raise_for_status()
+            return len(response.json()["tokens"])
+        except (requests.RequestException, KeyError, ValueError):
+            return super().token_count(text)
+
+
+def _routing_from_env() -> Dict[str, str]:
+    """Parse SYNTHMED_LLM_ROUTING ("summary=local,*=watsonx") over DEFAULT_ROUTING."""
+    routing = dict(DEFAULT_ROUTING)
+    for rule in os.environ.get("SYNTHMED_LLM_ROUTING", "").split(","):
+        if "=" in rule:
+            output_format, backend = rule.split("=", 1)
+            routing[output_format.strip()] = backend.strip()
+    return routing
+
+
+class MedicalSynthesizer:
+    """
+    Medical research synthesizer using IBM watsonx.ai.
+    """
+
+    def __init__(self,
+                 model_id: str = DEFAULT_MODEL_ID,
+                 preprocessor: Optional[Callable[[str, List[Passage]],
+                                                 Tuple[List[Passage], Dict[str, Any]]]] = None,
+                 backends: Optional[Dict[str, LLMBackend]] = None,
+                 routing: Optional[Dict[str, str]] = None):
         """
-        Build context string from retrieved passages.
+        Initialize the synthesizer.
 
         Args:
-            passages: List of passage dictionaries
+            model_id: IBM watsonx.ai model ID to use
+            preprocessor: Optional step run on retrieved passages before the
+                context is built, e.g. ExtractiveCompressor(). Called as
+                preprocessor(query, passages) and returns (passages, stats).
+            backends: LLM backends by name (default: watsonx, plus local when
+                SYNTHMED_LOCAL_LLM_URL is set)
+            routing: Backend name per output_format, "*" for the default
+                (default: DEFAULT_ROUTING overridden by SYNTHMED_LLM_ROUTING)
+        """
+        self.model_id = model_id
+        self.preprocessor = preprocessor
 
-        Returns:
-            Formatted context string
+        if backends is None:
+            backends = {"watsonx": WatsonxBackend(model_id)}
+            if os.environ.get("SYNTHMED_LOCAL_LLM_URL"):
+                backends["local"] = LocalBackend()
+        self.backends = backends
+        self.routing = routing if routing is not None else _routing_from_env()
+
+        self.watsonx_available = "watsonx" in backends and backends["watsonx"].available
+
+    def select_backend(self, output_format: str) -> Optional[LLMBackend]:
         """
-        context_parts = []
+        Pick the backend for an output format.
 
-        for i, passage in enumerate(passages):
-            text = passage.get("text", "")
-            metadata = passage.get("metadata", {})
+        Args:
+            output_format: Output format (comprehensive, summary, table)
 
-            source = metadata.get("source", "Unknown source")
-            domain = metadata.get("disease_domain", "general")
+        Returns:
+            The routed backend if available, otherwise the first available
+            backend, or None when no backend is available
+        """
+        name = self.routing.get(output_format, self.routing.get("*", "watsonx"))
+        backend = self.backends.get(name)
+        if backend is not None and backend.available:
+            return backend
 
-            context_parts.append(
-                f"[Source {i+1}: {source}, Domain: {domain}]\n{text}\n"
-            )
+        for backend in self.backends.values():
+            if backend.available:
+                return backend
 
-        return "\n---\n".join(context_parts)
+        return None
 
-    def _create_synthesis_prompt(self,
-                                  query: str,
-                                  context: str,
-                                  output_format: str) -> str:
+    def synthesize_with_context(self,
+                                 query: str,
+                                 retrieved_passages: List[Union[Passage, Dict[str, Any]]],
+                                 output_format: str = "comprehensive") -> Dict[str, Any]:
         """
-        Create synthesis prompt for the LLM.
+        Synthesize information from multiple retrieved passages.
 
         Args:
-            query: Research question
-            context: Retrieved context passages
-            output_format: Desired output format
+            query: Research question or query
+            retrieved_passages: List of relevant passages with metadata
+                (Passage objects or passage dictionaries)
+            output_format: Output format (comprehensive, summary, table)
 
         Returns:
-            Formatted prompt string
+            Dictionary with synthesized content
         """
-        if output_format == "comprehensive":
-            format_instructions = """
-Generate a comprehensive research synthesis with:
-1. Executive Summary (2-3 sentences)
-2. Detailed Synthesis (organized by key themes)
-3. Key Findings (bullet points)
-4. Cross-Domain Connections (if applicable)
-5. References (numbered list)
-"""
-        elif output_format == "summary":
-            format_instructions = """
-Generate a concise summary (3-5 sentences) that:
-- Answers the research question directly
-- Highlights the most important findings
-- Maintains scientific accuracy
-"""
-        else:  # table
-            format_instructions = """
-Generate a structured table format with:
-- Disease Domain | Key Finding | Source | Confidence
-- Organize findings by domain
-- Include citations
-"""
+        # Convert once; everything below reads Passage attributes
+        retrieved_passages = to_passages(retrieved_passages)
 
-        prompt = f"""You are a medical research synthesis expert. Analyze the following research question and context to generate a comprehensive, accurate synthesis.
+        # Optional pre-processing (e.g. extractive compression)
+        preprocessing = None
+        if self.preprocessor is not None:
+            retrieved_passages, preprocessing = self.preprocessor(query, retrieved_passages)
 
-Research Question:
-{query}
+        # Build the prompt (context included) from the precompiled template
+        backend = self.select_backend(output_format)
+        model_id = backend.model_id if backend is not None else "fallback"
+        token_counter = backend.token_count if backend is not None else estimate_tokens
+        prompt, prompt_tokens = get_prompt_template(output_format).render(query, retrieved_passages, token_counter)
 
-Context from Medical Literature:
-{context}
+        # Generate synthesis
+        if backend is not None:
+            synthesis = self._generate_with_backend(backend, prompt)
+        else:
+            synthesis = self._generate_fallback(prompt, retrieved_passages)
 
-Instructions:
-{format_instructions}
+        # Extract citations from passages
+        citations = self._extract_citations(retrieved_passages)
 
-Requirements:
-- Synthesize information across all sources
-- Maintain scientific rigor and accuracy
-- Use proper citations [Source X]
-- Identify areas of consensus and disagreement
-- Note confidence levels and evidence quality
-- Avoid making clinical recommendations
+        result = {
+            "query": query,
+            "synthesis": synthesis,
+            "citations": citations,
+            "source_count": len(retrieved_passages),
+            "model": model_id,
+            "backend": backend.name if backend is not None else "fallback",
+            "prompt_tokens": prompt_tokens
+        }
 
-Synthesis:"""
+        if preprocessing is not None:
+            result["preprocessing"] = preprocessing
 
-        return prompt
+        return result
 
-    def _generate_with_watsonx(self, prompt: str) -> str:
+    def _generate_with_backend(self, backend: LLMBackend, prompt: str) -> str:
         """
-        Generate synthesis using IBM watsonx.ai.
+        Generate synthesis using an LLM backend.
 
         Args:
+            backend: Backend selected for the output format
             prompt: Input prompt
 
         Returns:
             Generated synthesis text
         """
         try:
-            parameters = {
-                "max_new_tokens": 2000,
-                "temperature": 0.7,
-                "top_p": 0.9,
-                "top_k": 50
-            }
-
-            response = self.model.generate_text(
-                prompt=prompt,
-                params=parameters
-            )
-
-            return response
+            return backend.generate(prompt, DEFAULT_PARAMETERS)
 
         except Exception as e:
-            return f"Error generating with watsonx.ai: {str(e)}"
+            return f"Error generating with {backend.name} backend: {str(e)}"
 
-    def _generate_fallback(self, prompt: str, context: str) -> str:
+    def _generate_fallback(self, prompt: str, passages: List[Passage]) -> str:
         """
-        Fallback synthesis when watsonx.ai is not available.
+        Fallback synthesis when no LLM backend is available.
 
         Args:
             prompt: Input prompt
-            context: Retrieved context
+            passages: Retrieved passages
 
         Returns:
-            Basic synthesis based on context
+            Basic synthesis based on the passages
         """
-        # Extract key information from context
-        sources = context.split("---")
-
-        synthesis = "## Synthesis (Fallback Mode - IBM watsonx.ai not configured)\n\n"
-        synthesis += "**Note:** This is a basic extraction. For AI-powered synthesis, configure IBM watsonx.ai credentials.\n\n"
-
-        synthesis += f"### Retrieved Sources ({len(sources)})\n\n"
-        for i, source in enumerate(sources[:5]):  # Limit to first 5
-            lines = source.strip().split('\n')
-            if len(lines) > 2:
-                synthesis += f"{i+1}. {lines[0]}\n"
-                synthesis += f"   Preview: {lines[1][:200]}...\n\n"
-
-        synthesis += "\n### Action Required\n"
-        synthesis += "Configure IBM watsonx.ai to enable AI-powered synthesis:\n"
-        synthesis += "1. Set WATSONX_API_KEY environment variable\n"
-        synthesis += "2. Set WATSONX_PROJECT_ID environment variable\n"
-
-        return synthesis
-
-    def _extract_citations(self, passages: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+        synthesis = ["## Synthesis (Fallback Mode - no LLM backend configured)\n\n",
+                     "**Note:** This is a basic extraction. For AI-powered synthesis, configure IBM watsonx.ai credentials.\n\n",
+                     f"### Retrieved Sources ({len(passages)})\n\n"]
+
+        for i, passage in enumerate(passages[:5]):  # Limit to first 5
+            source = passage.source if passage.source is not None else "Unknown source"
+            domain = passage.disease_domain if passage.disease_domain is not None else "general"
+            text = passage.text.strip()
+            preview = text.split("\n", 1)[0][:200]
+            synthesis.append(f"{i+1}. [Source {i+1}: {source}, Domain: {domain}]\n")
+            synthesis.append(f"   Preview: {preview}...\n\n")
+
+        synthesis.append("\n### Action Required\n")
+        synthesis.append("Configure IBM watsonx.ai to enable AI-powered synthesis:\n")
+        synthesis.append("1. Set WATSONX_API_KEY environment variable\n")
+        synthesis.append("2. Set WATSONX_PROJECT_ID environment variable\n")
+        synthesis.append("Or point SYNTHMED_LOCAL_LLM_URL at a local llama.cpp-compatible server.\n")
+
+        return "".join(synthesis)
+
+    def _extract_citations(self, passages: List[Passage]) -> List[Dict[str, str]]:
         """
         Extract citations from retrieved passages.
 
         Args:
-            passages: List of passage dictionaries
+            passages: List of passages
 
         Returns:
             List of citation dictionaries
         """
-        citations = []
-
-        for i, passage in enumerate(passages):
-            metadata = passage.get("metadata", {})
-
-            citation = {
-                "id": i + 1,
-                "source": metadata.get("source", "Unknown"),
-                "title": metadata.get("title", "Unknown"),
-                "author": metadata.get("author", "Unknown"),
-                "disease_domain": metadata.get("disease_domain", "general"),
-                "url": metadata.get("pdf_path", "")
-            }
-
-            citations.append(citation)
-
-        return citations
+        return [Citation.from_passage(i, passage).to_dict() for i, passage in enumerate(passages, 1)]
 
     def synthesize_cross_domain(self,
                                 query: str,
@@ -289,79 +740,289 @@ Synthesis:"""
         return synthesis
 
 
-# Tool wrappers for IBM watsonx Orchestrate
-@tool
-def llm_synthesizer(query: str, context: str, output_format: str = "comprehensive") -> str:
+_JSON_DECODER = json.JSONDecoder()
+_JSON_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def _expect(text: str, pos: int, chars: str) -> str:
+    """Return the character at pos if it is one of chars, else raise JSONDecodeError."""
+    if pos >= len(text) or text[pos] not in chars:
+        raise json.JSONDecodeError(f"Expecting one of {chars!r}", text, pos)
+    return text[pos]
+
+
+def _expect_end(text: str, pos: int) -> None:
+    """Raise JSONDecodeError if anything but whitespace follows pos."""
+    pos = _JSON_WHITESPACE.match(text, pos).end()
+    if pos != len(text):
+        raise json.JSONDecodeError("Extra data", text, pos)
+
+
+def _member_name(text: str, pos: int) -> Tuple[str, int]:
+    """Decode an object member name and its colon; return (name, value position)."""
+    _expect(text, pos, '"')
+    name, pos = _JSON_DECODER.raw_decode(text, pos)
+    pos = _JSON_WHITESPACE.match(text, pos).end()
+    _expect(text, pos, ":")
+    return name, _JSON_WHITESPACE.match(text, pos + 1).end()
+
+
+def iter_json_array(text: str, key: Optional[str] = None) -> Iterator[Any]:
     """
-    Synthesize medical research information using IBM watsonx.ai LLM.
+    Incrementally decode the items of a JSON array.
+
+    Items are decoded and yielded one at a time, so only the current item
+    is materialized rather than the whole document. With key, the array is
+    read from that member of a top-level object (e.g. "articles" in
+    pubmed_search output); other members are skipped. The rest of the
+    document is still checked, so trailing data raises like json.loads.
 
     Args:
-        query: Research question to answer
-        context: Retrieved context passages (JSON string or plain text)
-        output_format: Output format (comprehensive, summary, or table)
+        text: JSON document
+        key: Object member holding the array, or None for a top-level array
 
-    Returns:
-        JSON string with synthesized content, citations, and metadata
+    Yields:
+        Decoded array items
+
+    Raises:
+        json.JSONDecodeError: If the document is malformed
+    """
+    ws = _JSON_WHITESPACE.match
+    pos = ws(text, 0).end()
+
+    if key is not None:
+        _expect(text, pos, "{")
+        pos = ws(text, pos + 1).end()
+        if _expect(text, pos, '}"') == "}":
+            _expect_end(text, pos + 1)
+            return
+        while True:
+            name, pos = _member_name(text, pos)
+            if name == key:
+                break
+            _, pos = _JSON_DECODER.raw_decode(text, pos)
+            pos = ws(text, pos).end()
+            if _expect(text, pos, ",}") == "}":
+                _expect_end(text, pos + 1)
+                return
+            pos = ws(text, pos + 1).end()
+
+    _expect(text, pos, "[")
+    pos = ws(text, pos + 1).end()
+    if pos >= len(text) or text[pos] != "]":
+        while True:
+            item, pos = _JSON_DECODER.raw_decode(text, pos)
+            yield item
+            pos = ws(text, pos).end()
+            if _expect(text, pos, ",]") == "]":
+                break
+            pos = ws(text, pos + 1).end()
+    pos = ws(text, pos + 1).end()
+
+    if key is not None:
+        # Skip the members after the array
+        while _expect(text, pos, ",}") == ",":
+            _, pos = _member_name(text, ws(text, pos + 1).end())
+            _, pos = _JSON_DECODER.raw_decode(text, pos)
+            pos = ws(text, pos).end()
+        pos += 1
+
+    _expect_end(text, pos)
+
+
+def parse_context_passages(context: str, streaming: bool = False) -> List[Passage]:
     """
-    synthesizer = MedicalSynthesizer()
+    Parse llm_synthesizer context into passages.
 
+    Args:
+        context: JSON list of passages, or plain text
+        streaming: Decode a JSON list item by item (see iter_json_array),
+            converting each item to a Passage as it is read. Lowers peak
+            memory for very large contexts but decodes more slowly than
+            the default single-pass decode
+
+    Returns:
+        List of passages
+    """
     # Parse context if it's JSON
     try:
-        passages = json.loads(context)
+        if streaming and context.lstrip().startswith("["):
+            return to_passages(iter_json_array(context))
+        passages = load_json(context)
         if not isinstance(passages, list):
-            passages = [{"text": context, "metadata": {}}]
+            return [Passage(context)]
     except json.JSONDecodeError:
-        passages = [{"text": context, "metadata": {}}]
+        return [Passage(context)]
+
+    return to_passages(passages)
 
-    result = synthesizer.synthesize_with_context(query, passages, output_format)
 
-    return json.dumps(result, indent=2)
+def article_to_passage(article: Dict[str, Any]) -> Passage:
+    """
+    Convert a pubmed_search article into passage format.
 
+    Args:
+        article: Article dictionary from PubMedSearcher
 
-@tool
-def synthesize_research_query(query: str,
-                               knowledge_base_results: str,
-                               pubmed_results: str = None) -> str:
+    Returns:
+        Passage with title and abstract as text
     """
-    Synthesize information from both local knowledge base and PubMed sources.
+    return Article.from_dict(article).to_passage()
+
+
+def research_query_passages(knowledge_base_results: str,
+                            pubmed_results: Optional[str] = None,
+                            streaming: bool = False) -> List[Passage]:
+    """
+    Combine knowledge base results and PubMed articles into one passage list.
 
     Args:
-        query: Research question
         knowledge_base_results: JSON string with RAG retrieval results
         pubmed_results: Optional JSON string with PubMed search results
+        streaming: Decode passages and articles item by item, converting each
+            article as it is read instead of loading all articles first
+            (lower peak memory, slower decode)
 
     Returns:
-        JSON string with comprehensive synthesis combining all sources
+        List of passages, knowledge base passages first
     """
-    synthesizer = MedicalSynthesizer()
-
     # Parse knowledge base results
-    kb_passages = json.loads(knowledge_base_results) if knowledge_base_results else []
+    if not knowledge_base_results:
+        kb_passages = []
+    elif streaming and knowledge_base_results.lstrip().startswith("["):
+        kb_passages = to_passages(iter_json_array(knowledge_base_results))
+    else:
+        kb_passages = to_passages(load_json(knowledge_base_results))
 
     # Parse PubMed results if provided
     if pubmed_results:
         try:
-            pubmed_data = json.loads(pubmed_results)
-            articles = pubmed_data.get("articles", [])
-
-            # Convert PubMed articles to passage format
-            for article in articles:
-                kb_passages.append({
-                    "text": f"{article['title']}\n\n{article['abstract']}",
-                    "metadata": {
-                        "source": f"PubMed: {article['pmid']}",
-                        "title": article['title'],
-                        "author": ", ".join(article.get('authors', [])[:3]),
-                        "disease_domain": "pubmed",
-                        "citation": article.get('citation', ''),
-                        "url": article.get('url', '')
-                    }
-                })
+            if streaming:
+                # Convert PubMed articles to passage format as they are decoded
+                kb_passages.extend([
+                    article_to_passage(article)
+                    for article in iter_json_array(pubmed_results, key="articles")
+                ])
+            else:
+                pubmed_data = load_json(pubmed_results)
+                articles = pubmed_data.get("articles", [])
+
+                # Convert PubMed articles to passage format
+                for article in articles:
+                    kb_passages.append(article_to_passage(article))
         except json.JSONDecodeError:
             pass
 
-    # Generate synthesis
-    result = synthesizer.synthesize_with_context(query, kb_passages, "comprehensive")
+    return kb_passages
+
 
-    return json.dumps(result, indent=2)
+# Tool wrappers for IBM watsonx Orchestrate
+def synthesize_context(query: str,
+                       context: str,
+                       output_format: str = "comprehensive",
+                       compress: bool = False,
+                       streaming: bool = False,
+                       synthesizer: Optional[MedicalSynthesizer] = None) -> Dict[str, Any]:
+    """
+    Run the llm_synthesizer tool and return its result as a dictionary.
+
+    Args:
+        query: Research question to answer
+        context: Retrieved context passages (JSON string or plain text)
+        output_format: Output format (comprehensive, summary, or table)
+        compress: Compress passages before prompting (ignored when
+            synthesizer is given)
+        streaming: Decode the context incrementally
+        synthesizer: Synthesizer to use (default: a new one)
+
+    Returns:
+        Synthesis result dictionary
+    """
+    if synthesizer is None:
+        synthesizer = MedicalSynthesizer(preprocessor=ExtractiveCompressor() if compress else None)
+    passages = parse_context_passages(context, streaming=streaming)
+    return synthesizer.synthesize_with_context(query, passages, output_format)
+
+
+def synthesize_research(query: str,
+                        knowledge_base_results: str,
+                        pubmed_results: str = None,
+                        compress: bool = False,
+                        streaming: bool = False,
+                        synthesizer: Optional[MedicalSynthesizer] = None) -> Dict[str, Any]:
+    """
+    Run the synthesize_research_query tool and return its result as a dictionary.
+
+    Args:
+        query: Research question
+        knowledge_base_results: JSON string with RAG retrieval results
+        pubmed_results: Optional JSON string with PubMed search results
+        compress: Compress passages before prompting (ignored when
+            synthesizer is given)
+        streaming: Decode the results incrementally
+        synthesizer: Synthesizer to use (default: a new one)
+
+    Returns:
+        Synthesis result dictionary
+    """
+    if synthesizer is None:
+        synthesizer = MedicalSynthesizer(preprocessor=ExtractiveCompressor() if compress else None)
+    passages = research_query_passages(knowledge_base_results, pubmed_results, streaming=streaming)
+    return synthesizer.synthesize_with_context(query, passages, "comprehensive")
+
+
+@tool
+def llm_synthesizer(query: str,
+                    context: str,
+                    output_format: str = "comprehensive",
+                    compress: bool = False,
+                    streaming: bool = False,
+                    compact: bool = False) -> str:
+    """
+    Synthesize medical research information using IBM watsonx.ai LLM.
+
+    Args:
+        query: Research question to answer
+        context: Retrieved context passages (JSON string or plain text)
+        output_format: Output format (comprehensive, summary, or table)
+        compress: Reduce each passage to its most query-relevant sentences
+            before prompting (smaller, faster prompts)
+        streaming: Decode the context item by item (lower peak memory for
+            very large inputs, slower than the default decode)
+        compact: Return minified JSON (smaller and faster to pass between tools)
+
+    Returns:
+        JSON string with synthesized content, citations, and metadata
+    """
+    result = synthesize_context(query, context, output_format=output_format, compress=compress,
+                                streaming=streaming)
+    return dump_result(result, compact=compact)
+
+
+@tool
+def synthesize_research_query(query: str,
+                               knowledge_base_results: str,
+                               pubmed_results: str = None,
+                               compress: bool = False,
+                               streaming: bool = False,
+                               compact: bool = False) -> str:
+    """
+    Synthesize information from both local knowledge base and PubMed sources.
+
+    Args:
+        query: Research question
+        knowledge_base_results: JSON string with RAG retrieval results
+        pubmed_results: Optional JSON string with PubMed search results
+        compress: Reduce each passage to its most query-relevant sentences
+            before prompting (smaller, faster prompts)
+        streaming: Decode the results item by item (lower peak memory for
+            very large inputs, slower than the default decode)
+        compact: Return minified JSON (smaller and faster to pass between tools)
+
+    Returns:
+        JSON string with comprehensive synthesis combining all sources
+    """
+    result = synthesize_research(query, knowledge_base_results, pubmed_results,
+                                 compress=compress, streaming=streaming)
+    return dump_result(result, compact=compact)
 
@@ -1,10 +1,13 @@
 # pdf_retriever.py
 import os
-import json
-from typing import Dict, List, Any
+import re
+from collections import Counter
+from typing import Dict, List, Any, Tuple, Optional, Callable
 import pymupdf  # PyMuPDF
+from synthmed_model import ChunkTable, dump_result
 from ibm_watsonx_orchestrate.agent_builder.tools import tool
 
+
 def extract_pdf_text(pdf_path: str) -> Dict[str, Any]:
     """
     Extract text, metadata, and structured content from a PDF file.
@@ -69,6 +72,26 @@ def extract_pdf_text(pdf_path: str) -> Dict[str, Any]:
         return {"error": f"Error processing PDF: {str(e)}"}
 
 
+def chunk_table(text: str, chunk_size: int = 1000, overlap: int = 200) -> ChunkTable:
+    """
+    Split text into overlapping chunks, stored as a ChunkTable.
+
+    The whitespace-normalized text is stored once and chunks reference it by
+    offset, instead of each chunk holding its own copy of the text.
+
+    Args:
+        text: Input text to chunk
+        chunk_size: Target size of each chunk in characters
+        overlap: Number of characters to overlap between chunks
+
+    Returns:
+        ChunkTable of word-window chunks
+    """
+    table = ChunkTable()
+    table.add_word_chunks(text, chunk_size=chunk_size, overlap=overlap)
+    return table
+
+
 def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200) -> List[Dict[str, Any]]:
     """
     Split text into overlapping chunks for embedding and retrieval.
@@ -79,66 +102,534 @@ def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200) -> List[Di
         overlap: Number of characters to overlap between chunks
 
     Returns:
-        List of dictionaries with chunk text and metadata
+        List of dictionaries with chunk text and metadata (built from a
+        chunk_table, which callers that keep chunks in memory should use)
     """
-    words = text.split()
-    chunks = []
+    return chunk_table(text, chunk_size=chunk_size, overlap=overlap).to_dicts()
 
-    # Calculate approximate words per chunk
-    chars_per_word = len(text) / len(words) if words else 1
-    words_per_chunk = int(chunk_size / chars_per_word)
-    words_overlap = int(overlap / chars_per_word)
 
-    start = 0
-    chunk_id = 0
+# Margin band (fraction of page height, or of page width for the side
+# margins) where running headers/footers and side watermarks live
+MARGIN_RATIO = 0.08
 
-    while start < len(words):
-        end = min(start + words_per_chunk, len(words))
-        chunk_text = ' '.join(words[start:end])
+# Fraction of pages a margin line must repeat on to count as a header/footer
+REPEAT_RATIO = 0.3
 
-        chunks.append({
-            "chunk_id": chunk_id,
-            "text": chunk_text,
-            "start_word": start,
-            "end_word": end,
-            "char_count": len(chunk_text),
-            "word_count": end - start
-        })
+# Matched against the heading with all whitespace removed, so letter-spaced
+# small caps ("R EFER ENCES") are recognized too
+REFERENCE_HEADINGS = re.compile(
+    r"^(\d+\.?)?(references|bibliography|literaturecited|workscited|referencesandnotes)$",
+    re.IGNORECASE
+)
+# Bold font names: a weight word, or a short weight suffix as in Springer
+# and Nature fonts ("AdvOT3b30f6db.B", "...Std-Bd"), which set no bold flag
+BOLD_FONT = re.compile(
+    r"bold|black|heavy|semibold|demi|medium|[.\-_,](b|bi|bd|bdit|sb)(\+\w+)?$",
+    re.IGNORECASE
+)
+ITALIC_FONT = re.compile(r"italic|oblique|[.\-_,](i|it)(\+\w+)?$", re.IGNORECASE)
+CAPTION_PREFIX = re.compile(r"^(fig\.?|figure|table|supplementary (figure|table))\s*\d+", re.IGNORECASE)
 
-        chunk_id += 1
-        start += words_per_chunk - words_overlap
 
-        # Avoid very small last chunks
-        if len(words) - start < words_overlap:
-            break
+def _line_text(line: Dict[str, Any]) -> str:
+    """Join the spans of a text line."""
+    return "".join(span["text"] for span in line["spans"])
 
-    return chunks
 
+def _join_lines(lines: List[str]) -> str:
+    """Join text lines into one whitespace-normalized string."""
+    text = " ".join(lines)
+    # Hyphenated line breaks and the wide gaps PyMuPDF emits for justified text
+    text = re.sub(r"(\w)- (\w)", r"\1\2", text)
+    return " ".join(text.split())
 
-@tool
-def pdf_retriever(pdf_path: str, include_chunks: bool = False, chunk_size: int = 1000) -> str:
+
+def _block_text(block: Dict[str, Any]) -> str:
+    """Join the spans of a text block into one whitespace-normalized string."""
+    return _join_lines([_line_text(line) for line in block["lines"]])
+
+
+def _block_style(block: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the dominant font size, font, and weight of a text block."""
+    return _lines_style(block["lines"])
+
+
+def _lines_style(lines: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Return the dominant font size, font, and weight of text lines."""
+    sizes = Counter()
+    fonts = Counter()
+    bold_chars = 0
+    italic_chars = 0
+    total_chars = 0
+    for line in lines:
+        for span in line["spans"]:
+            chars = len(span["text"].strip())
+            if not chars:
+                continue
+            sizes[round(span["size"] * 2) / 2] += chars
+            fonts[span["font"]] += chars
+            total_chars += chars
+            if span["flags"] & 16 or BOLD_FONT.search(span["font"]):
+                bold_chars += chars
+            if span["flags"] & 2 or ITALIC_FONT.search(span["font"]):
+                italic_chars += chars
+    size = sizes.most_common(1)[0][0] if sizes else 0.0
+    return {
+        "size": size,
+        "font": fonts.most_common(1)[0][0] if fonts else "",
+        "fonts": set(fonts),
+        "bold": total_chars > 0 and bold_chars == total_chars,
+        "italic": total_chars > 0 and italic_chars == total_chars,
+        "chars": total_chars
+    }
+
+
+def _order_blocks(blocks: List[Dict[str, Any]], page_width: float) -> List[Dict[str, Any]]:
     """
-    Retrieve and extract content from PDF files with optional text chunking.
+    Order blocks in reading order for one- and two-column layouts.
+
+    Blocks that span the page middle (titles, full-width figures) split the
+    page into bands; inside each band the left column is read before the right.
+    """
+    middle = page_width / 2
+    ordered = []
+    band = []
+
+    def flush():
+        band.sort(key=lambda b: (b["bbox"][0] >= middle, b["bbox"][1]))
+        ordered.extend(band)
+        band.clear()
+
+    for block in sorted(blocks, key=lambda b: b["bbox"][1]):
+        x0, _, x1, _ = block["bbox"]
+        if x0 < middle - 10 and x1 > middle + 10:
+            flush()
+            ordered.append(block)
+        else:
+            band.append(block)
+    flush()
+
+    return ordered
+
+
+def _margin_key(text: str) -> str:
+    """Normalize header/footer text so page numbers do not defeat matching."""
+    return re.sub(r"\d+", "#", text.lower())
+
+
+def _is_references_heading(text: str) -> bool:
+    """Check whether text is a References/Bibliography heading."""
+    if not text or not (text[0].isupper() or text[0].isdigit()):
+        return False
+    return bool(REFERENCE_HEADINGS.match("".join(text.split()).rstrip(".:")))
+
+
+def _is_heading(text: str, style: Dict[str, Any], line_count: int, body_size: float) -> bool:
+    """Decide whether a block is a section heading based on font size and weight."""
+    if not text or len(text) > 120 or line_count > 3:
+        return False
+    if _is_references_heading(text):
+        return True
+    if text.endswith((".", ",", ";")):
+        return False
+    # Figure panel labels ("A", "B C") and URLs/DOIs are not headings
+    if not any(len(word) >= 3 and word[0].isalpha() for word in text.split()) or "://" in text:
+        return False
+    if style["size"] >= body_size * 1.15:
+        return True
+    if style["size"] > body_size or style["bold"]:
+        # Slightly larger or bold body-size text: only short, title-like lines
+        return len(text.split()) <= 12
+    return False
+
+
+def _is_heading_line(text: str,
+                     style: Dict[str, Any],
+                     block_style: Dict[str, Any],
+                     body_size: float,
+                     leading: bool) -> bool:
+    """
+    Decide whether one line of a body block is a heading merged into it.
+
+    Leading lines may stand out by size or weight, where an upright font
+    other than the block's (e.g. a sans heading face over serif body text,
+    often a point smaller) counts as weight; lines further into the block
+    must be set at least a point larger, since bold-only lines there are
+    usually table cells or emphasis.
+    """
+    if _is_references_heading(text):
+        return True
+    # A trailing hyphen means the line continues into the next one
+    if not (text[0].isupper() or text[0].isdigit()) or text.endswith("-"):
+        return False
+    # Run-in headings share their line with body text, so the whole line must
+    # be in other fonts
+    own_font = (leading and block_style["font"] not in style["fonts"] and not style["italic"]
+                and style["size"] >= body_size - 1)
+    if style["size"] < body_size and not own_font:
+        return False
+    # Sizes are rounded to half points, so require a full point to call it larger
+    larger = style["size"] >= block_style["size"] + 1
+    weighted = leading and (style["bold"] or own_font) and not block_style["bold"]
+    if not (larger or weighted):
+        return False
+    return _is_heading(text, dict(style, bold=True) if own_font else style, 1, body_size)
+
+
+def _split_headings(block: Dict[str, Any], body_size: float) -> List[Tuple[bool, str]]:
+    """
+    Split a block into heading and body runs, detecting headings per line.
+
+    PyMuPDF often merges heading lines into the paragraph block around
+    them (some preprints come out as one block per page). Lines that pass
+    _is_heading_line are split off as headings, up to three consecutive
+    lines per heading.
+
+    Args:
+        block: Block from extract_pdf_structure's first pass
+        body_size: Document body font size
+
+    Returns:
+        List of (is_heading, text) runs in order
+    """
+    if not block["horizontal"]:
+        # Rotated text (landscape table cells, side labels) is never a heading
+        return [(False, block["text"])]
+    if _is_heading(block["text"], block["style"], block["lines"], body_size):
+        return [(True, block["text"])]
+
+    runs = []
+    body = []
+    heading = []
+    for line, style in zip(block["line_texts"], block["line_styles"]):
+        text = _join_lines([line])
+        if not text:
+            continue
+        if _is_heading_line(text, style, block["style"], body_size, leading=not body and not runs):
+            if body:
+                runs.append((False, _join_lines(body)))
+                body = []
+            # A References heading always starts its own heading run
+            if heading and (len(heading) == 3 or _is_references_heading(text)):
+                runs.append((True, _join_lines(heading)))
+                heading = []
+            heading.append(text)
+            continue
+        if heading:
+            runs.append((True, _join_lines(heading)))
+            heading = []
+        body.append(line)
+    if heading:
+        runs.append((True, _join_lines(heading)))
+    if body:
+        runs.append((False, _join_lines(body)))
+
+    return runs
+
+
+def extract_pdf_structure(pdf_path: str, include_references: bool = False) -> Dict[str, Any]:
+    """
+    Extract section-structured content from a scientific PDF.
+
+    Uses PyMuPDF block/font information instead of plain page text so that
+    two-column layouts are read in order, repeated running headers/footers
+    are dropped, figure/table captions are separated from body text, and
+    References sections are tagged (and left out of the text by default).
+
+    Args:
+        pdf_path: Path to the PDF file
+        include_references: Whether References sections count as body text
+
+    Returns:
+        Dictionary containing extracted content with keys:
+        - text: Body text (section by section)
+        - metadata: PDF metadata (title, author, etc.)
+        - sections: List of sections with title, page range, text, and
+          is_references flag
+        - captions: Figure/table captions with page numbers
+        - body_font_size: Detected body text font size
+        - removed_blocks: Number of header/footer blocks dropped
+    """
+    if not os.path.exists(pdf_path):
+        return {"error": f"PDF file not found: {pdf_path}"}
+
+    try:
+        doc = pymupdf.open(pdf_path)
+        metadata = doc.metadata
+
+        # Pass 1: collect text blocks and font statistics
+        pages = []
+        size_chars = Counter()
+        margin_counts = Counter()
+
+        for page_num in range(len(doc)):
+            page = doc[page_num]
+            height = page.rect.height
+            width = page.rect.width
+            blocks = []
+            margin_keys = set()
+
+            for block in page.get_text("dict")["blocks"]:
+                if block["type"] != 0:
+                    continue
+                text = _block_text(block)
+                if not text:
+                    continue
+                style = _block_style(block)
+                line_texts = [_line_text(line) for line in block["lines"]]
+                x0, y0, x1, y1 = block["bbox"]
+                # Top/bottom bands, or side bands for rotated watermarks such
+                # as "Author Manuscript" on NIH manuscripts
+                in_margin = (y1 <= height * MARGIN_RATIO or y0 >= height * (1 - MARGIN_RATIO)
+                             or x1 <= width * MARGIN_RATIO or x0 >= width * (1 - MARGIN_RATIO))
+                if in_margin:
+                    margin_keys.add(_margin_key(text))
+                size_chars[style["size"]] += style["chars"]
+                blocks.append({
+                    "bbox": block["bbox"],
+                    "text": text,
+                    "style": style,
+                    "lines": len(block["lines"]),
+                    "line_texts": line_texts,
+                    "line_styles": [_lines_style([line]) for line in block["lines"]],
+                    "horizontal": all(abs(line["dir"][1]) < 0.01 for line in block["lines"]),
+                    "in_margin": in_margin
+                })
+
+            margin_counts.update(margin_keys)
+            pages.append((page_num + 1, page.rect.width, blocks))
+
+        doc.close()
+
+        body_size = size_chars.most_common(1)[0][0] if size_chars else 0.0
+        min_repeats = max(2, int(len(pages) * REPEAT_RATIO))
+        repeated = {key for key, count in margin_counts.items() if count >= min_repeats}
+
+        # Pass 2: walk blocks in reading order and split into sections
+        sections = []
+        captions = []
+        removed_blocks = 0
+        current = {"title": "", "page_start": 1, "page_end": 1, "is_references": False, "paragraphs": []}
+
+        for page_number, page_width, blocks in pages:
+            for block in _order_blocks(blocks, page_width):
+                text = block["text"]
+                if block["in_margin"] and (_margin_key(text) in repeated or text.isdigit()):
+                    removed_blocks += 1
+                    continue
+
+                if CAPTION_PREFIX.match(text):
+                    captions.append({"page": page_number, "text": text})
+                    continue
+
+                for is_heading, run in _split_headings(block, body_size):
+                    if is_heading:
+                        if current["paragraphs"] or current["title"]:
+                            sections.append(current)
+                        current = {
+                            "title": run,
+                            "page_start": page_number,
+                            "page_end": page_number,
+                            "is_references": _is_references_heading(run),
+                            "paragraphs": []
+                        }
+                    else:
+                        current["paragraphs"].append(run)
+                        current["page_end"] = page_number
+
+        if current["paragraphs"] or current["title"]:
+            sections.append(current)
+
+        # Headings with no body (e.g. a section title directly followed by a
+        # subsection title) are folded into the next section's title.
+        merged = []
+        pending_title = ""
+        for section in sections:
+            if section["is_references"]:
+                # Keep References titled as such so they stay recognizable
+                pending_title = ""
+            if not section["paragraphs"] and not section["is_references"]:
+                pending_title = f"{pending_title} / {section['title']}" if pending_title else section["title"]
+                continue
+            if pending_title:
+                section["title"] = f"{pending_title} / {section['title']}" if section["title"] else pending_title
+                pending_title = ""
+            section["text"] = "\n\n".join(section.pop("paragraphs"))
+            section["word_count"] = len(section["text"].split())
+            merged.append(section)
+
+        body = [s["text"] for s in merged if include_references or not s["is_references"]]
+        full_text = "\n\n".join(body)
+
+        return {
+            "text": full_text,
+            "metadata": metadata,
+            "page_count": len(pages),
+            "sections": merged,
+            "captions": captions,
+            "body_font_size": body_size,
+            "removed_blocks": removed_blocks,
+            "word_count": len(full_text.split())
+        }
+
+    except Exception as e:
+        return {"error": f"Error processing PDF: {str(e)}"}
+
+
+def section_chunk_table(sections: List[Dict[str, Any]],
+                        chunk_size: int = 1000,
+                        include_references: bool = False) -> ChunkTable:
+    """
+    Split sections into chunks that never cross a section boundary.
+
+    Whole paragraphs are packed into each chunk up to chunk_size characters;
+    paragraphs longer than chunk_size fall back to word windows. All chunks
+    reference the section text by offset rather than copying it.
+
+    Args:
+        sections: Sections from extract_pdf_structure
+        chunk_size: Target size of each chunk in characters
+        include_references: Whether to chunk References sections
+
+    Returns:
+        ChunkTable with section title and page range per chunk
+    """
+    table = ChunkTable()
+
+    for section in sections:
+        if section["is_references"] and not include_references:
+            continue
+
+        text = section["text"]
+        segment = table.add_segment(text)
+        title = table.add_section(section["title"])
+        pages = {"section": title, "page_start": section["page_start"], "page_end": section["page_end"]}
+
+        buffer = []
+        buffer_start = 0
+        buffer_len = 0
+        buffer_words = 0
+        pos = 0
+        for paragraph in text.split("\n\n"):
+            paragraph_words = paragraph.count(" ") + 1 if paragraph else 0
+            if len(paragraph) > chunk_size:
+                # Oversized paragraph: word-split it together with whatever is
+                # buffered so the buffer does not end up as a tiny chunk.
+                table.add_segment_word_chunks(segment, buffer_start if buffer else pos, pos + len(paragraph),
+                                              chunk_size=chunk_size, overlap=0, **pages)
+                buffer, buffer_len, buffer_words = [], 0, 0
+                pos += len(paragraph) + 2
+                continue
+            if buffer and buffer_len + len(paragraph) + 2 > chunk_size:
+                table.append(segment, buffer_start, pos - 2, buffer_words, **pages)
+                buffer, buffer_len, buffer_words = [], 0, 0
+            if not buffer:
+                buffer_start = pos
+            buffer.append(paragraph)
+            buffer_len += len(paragraph) + 2
+            buffer_words += paragraph_words
+            pos += len(paragraph) + 2
+        if buffer:
+            table.append(segment, buffer_start, pos - 2, buffer_words, **pages)
+
+    return table
+
+
+def chunk_sections(sections: List[Dict[str, Any]],
+                   chunk_size: int = 1000,
+                   include_references: bool = False) -> List[Dict[str, Any]]:
+    """
+    Split sections into chunks that never cross a section boundary.
+
+    Args:
+        sections: Sections from extract_pdf_structure
+        chunk_size: Target size of each chunk in characters
+        include_references: Whether to chunk References sections
+
+    Returns:
+        List of dictionaries with chunk text and section metadata (built
+        from a section_chunk_table, which callers that keep chunks in memory
+        should use)
+    """
+    return section_chunk_table(sections, chunk_size=chunk_size,
+                               include_references=include_references).to_dicts()
+
+
+def resolve_pdf_path(pdf_path: str) -> str:
+    """
+    Resolve a PDF path, treating relative paths as relative to the repository
+    root (so "knowledge_bases/autism/x.pdf" works from any working directory).
 
     Args:
         pdf_path: Path to the PDF file (relative or absolute)
-        include_chunks: Whether to include chunked text for embeddings
-        chunk_size: Size of text chunks in characters (default: 1000)
 
     Returns:
-        JSON string containing extracted PDF content including text, metadata,
-        pages, tables, and optionally text chunks for RAG systems.
+        Absolute path to the PDF file
     """
     # Handle relative paths from knowledge_bases directory
     if not os.path.isabs(pdf_path):
         base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         pdf_path = os.path.join(base_dir, pdf_path)
+    return pdf_path
+
+
+def retrieve_pdf(pdf_path: str,
+                 include_chunks: bool = False,
+                 chunk_size: int = 1000,
+                 structural: bool = False,
+                 extract: Optional[Callable[[str, bool], Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Run the pdf_retriever tool and return its result as a dictionary.
+
+    Args:
+        pdf_path: Path to the PDF file (relative or absolute)
+        include_chunks: Whether to include chunked text for embeddings
+        chunk_size: Size of text chunks in characters
+        structural: Use section-aware extraction
+        extract: Optional extraction function (pdf_path, structural) -> result,
+            e.g. a cache; its results are never mutated
 
-    # Extract PDF content
-    result = extract_pdf_text(pdf_path)
+    Returns:
+        Extraction result, with "chunks" when include_chunks is set
+    """
+    if extract is not None:
+        result = extract(pdf_path, structural)
+    else:
+        pdf_path = resolve_pdf_path(pdf_path)
+        result = extract_pdf_structure(pdf_path) if structural else extract_pdf_text(pdf_path)
 
     if "error" not in result and include_chunks:
         # Add chunked text for RAG/embedding purposes
-        result["chunks"] = chunk_text(result["text"], chunk_size=chunk_size)
+        result = dict(result)
+        if structural:
+            result["chunks"] = chunk_sections(result["sections"], chunk_size=chunk_size)
+        else:
+            result["chunks"] = chunk_text(result["text"], chunk_size=chunk_size)
+
+    return result
+
+
+@tool
+def pdf_retriever(pdf_path: str,
+                  include_chunks: bool = False,
+                  chunk_size: int = 1000,
+                  structural: bool = False,
+                  compact: bool = False) -> str:
+    """
+    Retrieve and extract content from PDF files with optional text chunking.
 
-    return json.dumps(result, indent=2)
+    Args:
+        pdf_path: Path to the PDF file (relative or absolute)
+        include_chunks: Whether to include chunked text for embeddings
+        chunk_size: Size of text chunks in characters (default: 1000)
+        structural: Use section-aware extraction (drops running headers/footers
+            and References, chunks align to section boundaries)
+        compact: Return minified JSON (smaller and faster to pass between tools)
+
+    Returns:
+        JSON string containing extracted PDF content including text, metadata,
+        pages and tables (or sections and captions in structural mode), and
+        optionally text chunks for RAG systems.
+    """
+    result = retrieve_pdf(pdf_path, include_chunks=include_chunks, chunk_size=chunk_size, structural=structural)
+    return dump_result(result, compact=compact)
@@ -1,12 +1,74 @@
 # pubmed_search.py
 
 
+import os
+import re
 import json
 import time
-from typing import Dict, List, Any, Optional
+import sqlite3
+import threading
+from datetime import date, timedelta
+from typing import Dict, List, Any, Optional, Iterator, Callable
 import requests
 from xml.etree import ElementTree as ET
 from ibm_watsonx_orchestrate.agent_builder.tools import tool
+from synthmed_model import dump_result
+
+
+# Start of the publication date range swept when a search exceeds the
+# E-utilities record cap
+HISTORY_MIN_DATE = date(1800, 1, 1)
+
+
+class RateLimiter:
+    """
+    Thread-safe minimum spacing between requests.
+
+    NCBI limits requests per IP/API key, not per client object, so all
+    searchers in a process share one limiter per key (see rate_limiter_for).
+    """
+
+    def __init__(self, interval: float):
+        """
+        Initialize the limiter.
+
+        Args:
+            interval: Minimum seconds between requests
+        """
+        self.interval = interval
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        """Block until the next request slot, reserving it for the caller."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+_RATE_LIMITERS: Dict[Optional[str], RateLimiter] = {}
+_RATE_LIMITERS_LOCK = threading.Lock()
+
+
+def rate_limiter_for(api_key: Optional[str]) -> RateLimiter:
+    """
+    Return the process-wide rate limiter for an API key (3 requests/second
+    without a key, 10/second with one).
+
+    Args:
+        api_key: NCBI API key or None
+
+    Returns:
+        Shared RateLimiter
+    """
+    with _RATE_LIMITERS_LOCK:
+        limiter = _RATE_LIMITERS.get(api_key)
+        if limiter is None:
+            limiter = _RATE_LIMITERS[api_key] = RateLimiter(0.34 if not api_key else 0.1)
+        return limiter
 
 
 class PubMedSearcher:
@@ -16,6 +78,16 @@ class PubMedSearcher:
 
     BASE_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/"
 
+    # Above this many PMIDs efetch is sent as a POST to stay under URL limits
+    MAX_GET_IDS = 200
+
+    # Records per efetch page when paging through the history server
+    HISTORY_BATCH_SIZE = 200
+
+    # E-utilities only return the first 10,000 records of a PubMed search;
+    # larger result sets are swept in publication date slices below this size
+    MAX_HISTORY_RECORDS = 10000
+
     def __init__(self, email: Optional[str] = None, api_key: Optional[str] = None):
         """
         Initialize PubMed searcher.
@@ -27,6 +99,7 @@ class PubMedSearcher:
         self.email = email or "synthmed@example.com"
         self.api_key = api_key
         self.session = requests.Session()
+        self.rate_limiter = rate_limiter_for(api_key)
 
     def search(self, query: str, max_results: int = 10, sort: str = "relevance") -> List[str]:
         """
@@ -55,6 +128,8 @@ class PubMedSearcher:
             params["api_key"] = self.api_key
 
         try:
+            self._throttle()
+
             response = self.session.get(url, params=params, timeout=10)
             response.raise_for_status()
 
@@ -93,9 +168,12 @@ class PubMedSearcher:
 
         try:
             # Respect rate limits (3 requests/second without API key, 10/second with key)
-            time.sleep(0.34 if not self.api_key else 0.1)
+            self._throttle()
 
-            response = self.session.get(url, params=params, timeout=15)
+            if len(pmids) > self.MAX_GET_IDS:
+                response = self.session.post(url, data=params, timeout=30)
+            else:
+                response = self.session.get(url, params=params, timeout=15)
             response.raise_for_status()
 
             # Parse XML response
@@ -112,6 +190,218 @@ class PubMedSearcher:
         except Exception as e:
             return {"error": f"PubMed fetch failed: {str(e)}"}
 
+    def _throttle(self) -> None:
+        """
+        Wait to respect NCBI rate limits (3 requests/second without API key,
+        10/second with key), counted across every searcher in the process.
+        """
+        self.rate_limiter.wait()
+
+    def search_history(self, query: str, sort: str = "relevance",
+                       mindate: Optional[date] = None, maxdate: Optional[date] = None) -> Dict[str, Any]:
+        """
+        Run a search on the E-utilities history server.
+
+        The result set stays on the NCBI side and is referenced by WebEnv and
+        query_key, so it can be paged through with fetch_history without
+        sending PMIDs back.
+
+        Args:
+            query: Search query
+            sort: Sort order (relevance, pub_date, etc.)
+            mindate: Earliest publication date (inclusive, with maxdate)
+            maxdate: Latest publication date (inclusive, with mindate)
+
+        Returns:
+            Dictionary with webenv, query_key, and total count
+        """
+        url = f"{self.BASE_URL}esearch.fcgi"
+
+        params = {
+            "db": "pubmed",
+            "term": query,
+            "usehistory": "y",
+            "retmax": 0,
+            "retmode": "json",
+            "sort": sort,
+            "email": self.email
+        }
+
+        if mindate is not None and maxdate is not None:
+            params["datetype"] = "pdat"
+            params["mindate"] = mindate.strftime("%Y/%m/%d")
+            params["maxdate"] = maxdate.strftime("%Y/%m/%d")
+
+        if self.api_key:
+            params["api_key"] = self.api_key
+
+        try:
+            self._throttle()
+
+            response = self.session.get(url, params=params, timeout=10)
+            response.raise_for_status()
+
+            result = response.json().get("esearchresult", {})
+            if "webenv" not in result or "querykey" not in result:
+                return {"error": f"PubMed search failed: {result.get('ERROR', 'no history returned')}"}
+
+            return {
+                "webenv": result["webenv"],
+                "query_key": result["querykey"],
+                "count": int(result.get("count", 0))
+            }
+
+        except Exception as e:
+            return {"error": f"PubMed search failed: {str(e)}"}
+
+    def fetch_history(self, webenv: str, query_key: str, retstart: int = 0,
+                      retmax: int = HISTORY_BATCH_SIZE) -> List[Dict[str, Any]]:
+        """
+        Fetch one page of articles from a history server result set.
+
+        Args:
+            webenv: WebEnv returned by search_history
+            query_key: query_key returned by search_history
+            retstart: Index of the first record to fetch
+            retmax: Number of records to fetch
+
+        Returns:
+            List of article details with abstracts and metadata
+        """
+        url = f"{self.BASE_URL}efetch.fcgi"
+
+        params = {
+            "db": "pubmed",
+            "WebEnv": webenv,
+            "query_key": query_key,
+            "retstart": retstart,
+            "retmax": retmax,
+            "retmode": "xml",
+            "email": self.email
+        }
+
+        if self.api_key:
+            params["api_key"] = self.api_key
+
+        try:
+            self._throttle()
+
+            response = self.session.get(url, params=params, timeout=30)
+            response.raise_for_status()
+
+            root = ET.fromstring(response.content)
+
+            articles = []
+            for article in root.findall(".//PubmedArticle"):
+                parsed = self._parse_article(article)
+                if parsed:
+                    articles.append(parsed)
+
+            return articles
+
+        except Exception as e:
+            return {"error": f"PubMed fetch failed: {str(e)}"}
+
+    def iter_articles(self, query: str, max_results: Optional[int] = None,
+                      batch_size: int = HISTORY_BATCH_SIZE,
+                      sort: str = "relevance") -> Iterator[Dict[str, Any]]:
+        """
+        Lazily stream articles for a query through the history server.
+
+        Pages are fetched on demand, so memory stays bounded by batch_size
+        and callers can stop iterating early without fetching the rest.
+
+        E-utilities only return the first MAX_HISTORY_RECORDS records of a
+        search. When more are requested, the query is split into publication
+        date ranges (newest first) that each stay under the cap, so articles
+        come in date-slice order rather than in `sort` order across slices.
+
+        Args:
+            query: Search query
+            max_results: Maximum number of articles (None for all matches)
+            batch_size: Records per efetch request
+            sort: Sort order (relevance, pub_date, etc.)
+
+        Yields:
+            Article dictionaries; on failure a single {"error": ...}
+            dictionary is yielded and iteration stops
+        """
+        history = self.search_history(query, sort=sort)
+        if "error" in history:
+            yield history
+            return
+
+        total = history["count"]
+        if max_results is not None:
+            total = min(total, max_results)
+
+        if total <= self.MAX_HISTORY_RECORDS:
+            yield from self._iter_history(history, total, batch_size)
+            return
+
+        remaining = total
+        today = date.today()
+        # Upper bound leaves room for issues dated ahead of publication
+        slices = self._date_slices(query, sort, HISTORY_MIN_DATE, date(today.year + 1, 12, 31))
+        for history in slices:
+            if "error" in history:
+                yield history
+                return
+            for article in self._iter_history(history, min(history["count"], remaining), batch_size):
+                yield article
+                if "error" in article:
+                    return
+                remaining -= 1
+            if remaining <= 0:
+                return
+
+    def _iter_history(self, history: Dict[str, Any], total: int,
+                      batch_size: int) -> Iterator[Dict[str, Any]]:
+        """Page through the first total records of one history server result set."""
+        retstart = 0
+        while retstart < total:
+            retmax = min(batch_size, total - retstart)
+            articles = self.fetch_history(history["webenv"], history["query_key"],
+                                          retstart=retstart, retmax=retmax)
+            if isinstance(articles, dict) and "error" in articles:
+                yield articles
+                return
+
+            yield from articles
+            retstart += retmax
+
+    def _date_slices(self, query: str, sort: str, start: date, end: date) -> Iterator[Dict[str, Any]]:
+        """
+        Split a search into publication date ranges of at most
+        MAX_HISTORY_RECORDS records each, by bisecting the range.
+
+        Yields:
+            History server results (see search_history) for non-empty
+            ranges, newest first; an {"error": ...} dictionary when a search
+            fails or a single day still exceeds the cap
+        """
+        history = self.search_history(query, sort=sort, mindate=start, maxdate=end)
+        if "error" in history:
+            yield history
+            return
+        if history["count"] == 0:
+            return
+        if history["count"] <= self.MAX_HISTORY_RECORDS:
+            yield history
+            return
+        if start == end:
+            yield {"error": f"PubMed search returned {history['count']} articles published on "
+                            f"{start.isoformat()}, over the E-utilities limit of "
+                            f"{self.MAX_HISTORY_RECORDS} per search; narrow the query"}
+            return
+
+        middle = start + (end - start) // 2
+        for history in self._date_slices(query, sort, middle + timedelta(days=1), end):
+            yield history
+            if "error" in history:
+                return
+        yield from self._date_slices(query, sort, start, middle)
+
     def _parse_article(self, article_xml) -> Optional[Dict[str, Any]]:
         """
         Parse article XML into structured dictionary.
@@ -198,17 +488,34 @@ class PubMedSearcher:
 
         return f"{author_str}. {title}. {journal}. {year}."
 
-    def search_and_fetch(self, query: str, max_results: int = 10) -> Dict[str, Any]:
+    def search_and_fetch(self, query: str, max_results: int = 10,
+                         use_history: bool = False) -> Dict[str, Any]:
         """
         Search PubMed and fetch full article details in one call.
 
         Args:
             query: Search query
             max_results: Maximum number of results
+            use_history: Page through the E-utilities history server instead
+                of passing PMIDs back to efetch (for large result sets)
 
         Returns:
             Dictionary with search results and article details
         """
+        if use_history:
+            articles = []
+            for article in self.iter_articles(query, max_results=max_results):
+                if "error" in article:
+                    return article
+                articles.append(article)
+
+            return {
+                "query": query,
+                "result_count": len(articles),
+                "max_results": max_results,
+                "articles": articles
+            }
+
         # Search for PMIDs
         pmids = self.search(query, max_results=max_results)
 
@@ -229,21 +536,287 @@ class PubMedSearcher:
         }
 
 
+ARTICLE_STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    pmid TEXT NOT NULL UNIQUE,
+    title TEXT,
+    abstract TEXT,
+    authors TEXT,
+    journal TEXT,
+    year TEXT,
+    doi TEXT,
+    citation TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+    title, abstract, content='articles', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS articles_ai AFTER INSERT ON articles BEGIN
+    INSERT INTO articles_fts(rowid, title, abstract) VALUES (new.id, new.title, new.abstract);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_ad AFTER DELETE ON articles BEGIN
+    INSERT INTO articles_fts(articles_fts, rowid, title, abstract)
+    VALUES ('delete', old.id, old.title, old.abstract);
+END;
+"""
+
+
+def open_article_store(db_path: str, create: bool = False) -> sqlite3.Connection:
+    """
+    Open a local PubMed article store (SQLite with an FTS5 index).
+
+    Args:
+        db_path: Path to the SQLite database
+        create: Create the schema if it does not exist
+
+    Returns:
+        SQLite connection
+    """
+    if not create and not os.path.exists(db_path):
+        raise FileNotFoundError(f"PubMed article store not found: {db_path}")
+
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    if create:
+        conn.executescript(ARTICLE_STORE_SCHEMA)
+    return conn
+
+
+class LocalPubMedSearcher(PubMedSearcher):
+    """
+    PubMedSearcher backed by a local article store built from PubMed
+    baseline/update dumps (see scripts/pubmed_import.py). Needs no network
+    access and returns articles in the same shape as the E-utilities client.
+    """
+
+    COLUMNS = "pmid, title, abstract, authors, journal, year, doi, citation"
+
+    def __init__(self, db_path: Optional[str] = None):
+        """
+        Initialize local searcher.
+
+        Args:
+            db_path: Path to the article store (default: SYNTHMED_PUBMED_DB)
+        """
+        super().__init__()
+        self.db_path = db_path or os.environ.get("SYNTHMED_PUBMED_DB", "pubmed.sqlite")
+        self.conn = open_article_store(self.db_path)
+
+    # PubMed query tokens: a quoted phrase or a bare term, either with an
+    # optional [field] tag, or a parenthesis
+    QUERY_TOKEN = re.compile(r'"([^"]*)"(?:\[([^\]]*)\])?|([()])|([^\s()"\[\]]+)(?:\[([^\]]*)\])?')
+
+    # Field tags that select an FTS column; other tags ([MeSH], [au], ...)
+    # are dropped and the term is searched in title and abstract
+    FIELD_COLUMNS = {"ti": "title", "title": "title"}
+
+    # Date fields: the store has no date index, so these terms are skipped
+    DATE_FIELDS = frozenset(("dp", "pdat", "edat", "crdt", "mhda", "lr", "publication date",
+                             "date - publication", "date - entrez", "date - create"))
+
+    @classmethod
+    def _match_expression(cls, query: str) -> str:
+        """
+        Translate a PubMed-style query into an FTS5 expression.
+
+        Supports AND/OR/NOT (uppercase, as in PubMed), parentheses, quoted
+        phrases, trailing * wildcards and [field] tags. Adjacent terms are
+        ANDed. Dangling operators and unbalanced parentheses are dropped
+        rather than raising a syntax error.
+
+        Args:
+            query: Search query
+
+        Returns:
+            FTS5 MATCH expression (empty if the query has no searchable terms)
+        """
+        operators = ("AND", "OR", "NOT")
+        out: List[str] = []
+        depth = 0
+
+        def after_operand() -> bool:
+            return bool(out) and out[-1] not in operators and out[-1] != "("
+
+        def close_group() -> None:
+            # Drop a dangling operator and empty groups, then close the group
+            nonlocal depth
+            while out and out[-1] in operators:
+                out.pop()
+            depth -= 1
+            if out and out[-1] == "(":
+                out.pop()
+            else:
+                out.append(")")
+
+        for match in cls.QUERY_TOKEN.finditer(query):
+            phrase, phrase_field, paren, term, term_field = match.groups()
+
+            if paren == "(":
+                if after_operand():
+                    out.append("AND")
+                out.append("(")
+                depth += 1
+                continue
+            if paren == ")":
+                if depth:
+                    close_group()
+                continue
+            if term in operators:
+                if after_operand():
+                    out.append(term)
+                continue
+            if term is not None and term.upper() in operators:
+                # Lowercase operators are PubMed stopwords, not terms
+                continue
+
+            field = ((phrase_field if phrase is not None else term_field) or "").strip().lower()
+            if field in cls.DATE_FIELDS:
+                continue
+            text = phrase if phrase is not None else term
+            prefix = text.endswith("*")
+            text = text.rstrip("*")
+            if not re.search(r"\w", text):
+                continue
+
+            expression = '"' + text.replace('"', '""') + '"' + (" *" if prefix else "")
+            if field in cls.FIELD_COLUMNS:
+                expression = f"{cls.FIELD_COLUMNS[field]} : {expression}"
+            if after_operand():
+                out.append("AND")
+            out.append(expression)
+
+        while depth:
+            close_group()
+        while out and out[-1] in operators:
+            out.pop()
+        return " ".join(out)
+
+    def _select(self, query: str, sort: str, limit: Optional[int], columns: str) -> sqlite3.Cursor:
+        match = self._match_expression(query)
+        if sort == "pub_date":
+            # Newest first; "Unknown" and other non-year values last
+            order = "(a.year GLOB '[0-9][0-9][0-9][0-9]') DESC, a.year DESC"
+        else:
+            order = "articles_fts.rank"
+        sql = (f"SELECT {columns} FROM articles_fts JOIN articles a ON a.id = articles_fts.rowid "
+               f"WHERE articles_fts MATCH ? ORDER BY {order}")
+        params: List[Any] = [match]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self.conn.execute(sql, params)
+
+    def _row_to_article(self, row: tuple) -> Dict[str, Any]:
+        pmid, title, abstract, authors, journal, year, doi, citation = row
+        return {
+            "pmid": pmid,
+            "title": title,
+            "abstract": abstract,
+            "authors": json.loads(authors) if authors else [],
+            "journal": journal,
+            "year": year,
+            "doi": doi,
+            "url": f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/",
+            "citation": citation
+        }
+
+    def search(self, query: str, max_results: int = 10, sort: str = "relevance") -> List[str]:
+        if not self._match_expression(query):
+            return []
+        try:
+            cursor = self._select(query, sort, max_results, "a.pmid")
+            return [row[0] for row in cursor]
+        except sqlite3.Error as e:
+            return {"error": f"PubMed search failed: {str(e)}"}
+
+    def fetch_details(self, pmids: List[str]) -> List[Dict[str, Any]]:
+        if not pmids:
+            return []
+        try:
+            placeholders = ",".join("?" * len(pmids))
+            rows = self.conn.execute(
+                f"SELECT {self.COLUMNS} FROM articles WHERE pmid IN ({placeholders})", pmids
+            )
+            by_pmid = {row[0]: self._row_to_article(row) for row in rows}
+            return [by_pmid[pmid] for pmid in pmids if pmid in by_pmid]
+        except sqlite3.Error as e:
+            return {"error": f"PubMed fetch failed: {str(e)}"}
+
+    def iter_articles(self, query: str, max_results: Optional[int] = None,
+                      batch_size: int = PubMedSearcher.HISTORY_BATCH_SIZE,
+                      sort: str = "relevance") -> Iterator[Dict[str, Any]]:
+        if not self._match_expression(query):
+            return
+        try:
+            columns = ", ".join(f"a.{column.strip()}" for column in self.COLUMNS.split(","))
+            cursor = self._select(query, sort, max_results, columns)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                for row in rows:
+                    yield self._row_to_article(row)
+        except sqlite3.Error as e:
+            yield {"error": f"PubMed search failed: {str(e)}"}
+
+
+def create_searcher() -> PubMedSearcher:
+    """
+    Return the PubMed client for this environment: the local article store
+    when SYNTHMED_PUBMED_DB is set (air-gapped), otherwise E-utilities.
+
+    Returns:
+        PubMedSearcher or LocalPubMedSearcher
+    """
+    if os.environ.get("SYNTHMED_PUBMED_DB"):
+        return LocalPubMedSearcher()
+    return PubMedSearcher(email=os.environ.get("NCBI_EMAIL"), api_key=os.environ.get("NCBI_API_KEY"))
+
+
 # Tool wrapper for IBM watsonx Orchestrate
+def search_pubmed(query: str,
+                  max_results: int = 10,
+                  use_history: bool = False,
+                  make_searcher: Callable[[], PubMedSearcher] = create_searcher) -> Dict[str, Any]:
+    """
+    Run the pubmed_search tool and return its result as a dictionary.
+
+    Args:
+        query: Search query
+        max_results: Maximum number of articles to return
+        use_history: Page results through the PubMed history server
+        make_searcher: Returns the client to use (e.g. a per-thread cache)
+
+    Returns:
+        Dictionary with articles or an error
+    """
+    try:
+        searcher = make_searcher()
+    except FileNotFoundError as e:
+        # SYNTHMED_PUBMED_DB points at a missing article store
+        return {"error": str(e)}
+    return searcher.search_and_fetch(query, max_results=max_results, use_history=use_history)
+
+
 @tool
-def pubmed_search(query: str, max_results: int = 10) -> str:
+def pubmed_search(query: str,
+                  max_results: int = 10,
+                  use_history: bool = False,
+                  compact: bool = False) -> str:
     """
     Search PubMed for medical research articles and retrieve abstracts.
 
     Args:
         query: Search query (e.g., "autism genetics", "cancer metastasis")
         max_results: Maximum number of articles to return (default: 10)
+        use_history: Page results through the PubMed history server
+            (recommended for large max_results)
+        compact: Return minified JSON (smaller and faster to pass between tools)
 
     Returns:
         JSON string containing articles with titles, abstracts, authors,
-        journal information, and citations.
+        journal information, and citations. Served from the local article
+        store instead of PubMed when SYNTHMED_PUBMED_DB is set.
     """
-    searcher = PubMedSearcher()
-    result = searcher.search_and_fetch(query, max_results=max_results)
-    return json.dumps(result, indent=2)
+    result = search_pubmed(query, max_results=max_results, use_history=use_history)
+    return dump_result(result, compact=compact)
 
@@ -0,0 +1,536 @@
+# synthmed_model.py
+#
+# Shared data model for the SynthMed tools. Not a tool itself: it is
+# imported by the tool modules (import them with --package-root tools).
+
+import re
+import json
+from array import array
+from itertools import accumulate
+from typing import Dict, List, Any, Optional, Iterable, Union
+
+# Optional faster JSON codec for tool input and compact tool output
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# A word for chunking: a run of non-whitespace, as str.split() sees it
+WORD_PATTERN = re.compile(r"\S+")
+
+
+class Passage:
+    """
+    A retrieved passage: text plus the metadata fields the synthesizer reads.
+
+    Metadata keys other than the known ones are kept in `extra`. Fields that
+    were absent in the source dictionary stay None, so to_dict() reproduces
+    the original shape.
+    """
+
+    __slots__ = ("text", "source", "title", "author", "disease_domain",
+                 "citation", "url", "pdf_path", "extra")
+
+    FIELDS = ("source", "title", "author", "disease_domain", "citation", "url", "pdf_path")
+    _FIELD_SET = frozenset(FIELDS)
+
+    def __init__(self,
+                 text: str = "",
+                 source: Optional[str] = None,
+                 title: Optional[str] = None,
+                 author: Optional[str] = None,
+                 disease_domain: Optional[str] = None,
+                 citation: Optional[str] = None,
+                 url: Optional[str] = None,
+                 pdf_path: Optional[str] = None,
+                 extra: Optional[Dict[str, Any]] = None):
+        self.text = text
+        self.source = source
+        self.title = title
+        self.author = author
+        self.disease_domain = disease_domain
+        self.citation = citation
+        self.url = url
+        self.pdf_path = pdf_path
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Passage":
+        """
+        Build a passage from the {"text": ..., "metadata": {...}} shape.
+
+        Args:
+            data: Passage dictionary
+
+        Returns:
+            Passage
+        """
+        metadata = data.get("metadata") or {}
+        get = metadata.get
+        text = data.get("text")
+        # The key-set check skips building `extra` in the common case
+        if metadata.keys() <= cls._FIELD_SET:
+            extra = None
+        else:
+            extra = {k: v for k, v in metadata.items() if k not in cls._FIELD_SET}
+        return cls(
+            text if isinstance(text, str) else ("" if text is None else str(text)),
+            get("source"),
+            get("title"),
+            get("author"),
+            get("disease_domain"),
+            get("citation"),
+            get("url"),
+            get("pdf_path"),
+            extra
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert back to the {"text": ..., "metadata": {...}} shape.
+
+        Returns:
+            Passage dictionary
+        """
+        metadata = {}
+        for field in self.FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                metadata[field] = value
+        if self.extra:
+            metadata.update(self.extra)
+        return {"text": self.text, "metadata": metadata}
+
+    def with_text(self, text: str) -> "Passage":
+        """Return a copy with different text and the same metadata."""
+        return Passage(text, self.source, self.title, self.author, self.disease_domain,
+                       self.citation, self.url, self.pdf_path, self.extra)
+
+
+def to_passages(items: Iterable[Union[Passage, Dict[str, Any]]]) -> List[Passage]:
+    """
+    Convert passage dictionaries to Passage objects (Passages pass through).
+
+    Args:
+        items: Passages or passage dictionaries
+
+    Returns:
+        List of Passage objects
+    """
+    return [item if isinstance(item, Passage) else Passage.from_dict(item) for item in items]
+
+
+class Article:
+    """
+    A PubMed article in the shape PubMedSearcher._parse_article returns.
+    pubmed_search emits the dictionaries directly (they go straight to
+    JSON); the synthesizer reads them through Article.from_dict.
+    """
+
+    __slots__ = ("pmid", "title", "abstract", "authors", "journal", "year", "doi", "url", "citation")
+
+    def __init__(self,
+                 pmid: str,
+                 title: str = "No title",
+                 abstract: str = "",
+                 authors: Optional[List[str]] = None,
+                 journal: str = "Unknown",
+                 year: str = "Unknown",
+                 doi: Optional[str] = None,
+                 url: Optional[str] = None,
+                 citation: str = ""):
+        self.pmid = pmid
+        self.title = title
+        self.abstract = abstract
+        self.authors = authors or []
+        self.journal = journal
+        self.year = year
+        self.doi = doi
+        self.url = url if url is not None else f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/"
+        self.citation = citation
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Article":
+        """
+        Build an article from a pubmed_search article dictionary.
+
+        Args:
+            data: Article dictionary
+
+        Returns:
+            Article
+        """
+        return cls(
+            data["pmid"],
+            data["title"],
+            data["abstract"],
+            data.get("authors", []),
+            data.get("journal", "Unknown"),
+            data.get("year", "Unknown"),
+            data.get("doi"),
+            data.get("url", ""),
+            data.get("citation", "")
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert back to the pubmed_search article dictionary shape.
+
+        Returns:
+            Article dictionary
+        """
+        return {
+            "pmid": self.pmid,
+            "title": self.title,
+            "abstract": self.abstract,
+            "authors": self.authors,
+            "journal": self.journal,
+            "year": self.year,
+            "doi": self.doi,
+            "url": self.url,
+            "citation": self.citation
+        }
+
+    def to_passage(self) -> Passage:
+        """
+        Convert to a passage for synthesis.
+
+        Returns:
+            Passage with title and abstract as text
+        """
+        return Passage(
+            f"{self.title}\n\n{self.abstract}",
+            source=f"PubMed: {self.pmid}",
+            title=self.title,
+            author=", ".join(self.authors[:3]),
+            disease_domain="pubmed",
+            citation=self.citation,
+            url=self.url
+        )
+
+
+class Citation:
+    """
+    A numbered citation for a synthesized answer ([Source N]).
+    """
+
+    __slots__ = ("id", "source", "title", "author", "disease_domain", "url")
+
+    def __init__(self, id: int, source: str, title: str, author: str, disease_domain: str, url: str):
+        self.id = id
+        self.source = source
+        self.title = title
+        self.author = author
+        self.disease_domain = disease_domain
+        self.url = url
+
+    @classmethod
+    def from_passage(cls, number: int, passage: Passage) -> "Citation":
+        """
+        Build the citation for the passage shown as [Source number].
+
+        Args:
+            number: 1-based source number
+            passage: Cited passage
+
+        Returns:
+            Citation
+        """
+        return cls(
+            number,
+            passage.source if passage.source is not None else "Unknown",
+            passage.title if passage.title is not None else "Unknown",
+            passage.author if passage.author is not None else "Unknown",
+            passage.disease_domain if passage.disease_domain is not None else "general",
+            passage.pdf_path if passage.pdf_path is not None else ""
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert to the citation dictionary shape used in tool output.
+
+        Returns:
+            Citation dictionary
+        """
+        return {
+            "id": self.id,
+            "source": self.source,
+            "title": self.title,
+            "author": self.author,
+            "disease_domain": self.disease_domain,
+            "url": self.url
+        }
+
+
+class Chunk:
+    """
+    Read-only view of one row of a ChunkTable. Text is sliced from the
+    table's shared segment on access instead of being stored per chunk.
+    """
+
+    __slots__ = ("table", "index")
+
+    def __init__(self, table: "ChunkTable", index: int):
+        self.table = table
+        self.index = index
+
+    @property
+    def text(self) -> str:
+        return self.table.text(self.index)
+
+    @property
+    def section(self) -> Optional[str]:
+        section = self.table.section_index[self.index]
+        return self.table.sections[section] if section >= 0 else None
+
+    @property
+    def page_start(self) -> int:
+        return self.table.page_start[self.index]
+
+    @property
+    def page_end(self) -> int:
+        return self.table.page_end[self.index]
+
+    @property
+    def word_count(self) -> int:
+        return self.table.word_count[self.index]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self.table.chunk_dict(self.index)
+
+
+class ChunkTable:
+    """
+    Column store for document chunks.
+
+    Chunk text is stored once per segment (e.g. a document's normalized text
+    or a section's text); each chunk is a row of typed arrays holding its
+    segment, character offsets, word range, section, and page range.
+    Rows convert to the chunk dictionaries pdf_retriever has always returned;
+    the JSON tool output needs those dictionaries, so the memory saving
+    applies to callers that keep the table itself.
+    """
+
+    __slots__ = ("segments", "sections", "segment", "start", "end", "start_word",
+                 "word_count", "section_index", "page_start", "page_end")
+
+    def __init__(self):
+        self.segments: List[str] = []
+        self.sections: List[str] = []
+        self.segment = array("I")
+        self.start = array("q")
+        self.end = array("q")
+        self.start_word = array("q")
+        self.word_count = array("I")
+        self.section_index = array("i")
+        self.page_start = array("i")
+        self.page_end = array("i")
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def __getitem__(self, index: int) -> Chunk:
+        if not -len(self) <= index < len(self):
+            raise IndexError("chunk index out of range")
+        return Chunk(self, index % len(self))
+
+    def __iter__(self):
+        return (Chunk(self, i) for i in range(len(self)))
+
+    def add_segment(self, text: str) -> int:
+        """Store a text segment once and return its index."""
+        self.segments.append(text)
+        return len(self.segments) - 1
+
+    def add_section(self, title: str) -> int:
+        """Store a section title once and return its index."""
+        self.sections.append(title)
+        return len(self.sections) - 1
+
+    def append(self, segment: int, start: int, end: int, word_count: int,
+               start_word: int = -1, section: int = -1, page_start: int = 0, page_end: int = 0) -> None:
+        """
+        Add a chunk row.
+
+        Args:
+            segment: Index of the segment holding the text
+            start: Start character offset in the segment
+            end: End character offset in the segment
+            word_count: Number of words in the chunk
+            start_word: Index of the first word in the document (-1 if n/a)
+            section: Index of the section title (-1 for unsectioned chunks)
+            page_start: First page of the chunk (0 if unknown)
+            page_end: Last page of the chunk (0 if unknown)
+        """
+        self.segment.append(segment)
+        self.start.append(start)
+        self.end.append(end)
+        self.word_count.append(word_count)
+        self.start_word.append(start_word)
+        self.section_index.append(section)
+        self.page_start.append(page_start)
+        self.page_end.append(page_end)
+
+    def add_word_chunks(self, text: str, chunk_size: int = 1000, overlap: int = 200,
+                        section: int = -1, page_start: int = 0, page_end: int = 0) -> None:
+        """
+        Split text into overlapping word-window chunks (pdf_retriever.chunk_text
+        semantics), storing the whitespace-normalized text once.
+
+        Args:
+            text: Input text to chunk
+            chunk_size: Target size of each chunk in characters
+            overlap: Number of characters to overlap between chunks
+            section: Section index for the chunks (-1 for none)
+            page_start: First page of the text
+            page_end: Last page of the text
+        """
+        words = text.split()
+        if not words:
+            return
+
+        segment = self.add_segment(" ".join(words))
+        # offsets[i] is where word i starts in the normalized segment
+        offsets = [0]
+        offsets.extend(accumulate(len(word) + 1 for word in words))
+
+        self._add_windows(segment, offsets, [offset - 1 for offset in offsets[1:]], len(text),
+                          chunk_size, overlap, section, page_start, page_end)
+
+    def add_segment_word_chunks(self, segment: int, start: int, end: int, chunk_size: int = 1000,
+                                overlap: int = 200, section: int = -1, page_start: int = 0,
+                                page_end: int = 0) -> None:
+        """
+        Split segment[start:end] into word-window chunks that reference the
+        stored segment by offset, instead of storing a normalized copy.
+
+        Windows are sized as add_word_chunks would size them on the
+        whitespace-normalized range; chunk text keeps the segment's own
+        whitespace (e.g. paragraph breaks).
+
+        Args:
+            segment: Index of the segment holding the text
+            start: Start character offset in the segment
+            end: End character offset in the segment
+            chunk_size: Target size of each chunk in characters
+            overlap: Number of characters to overlap between chunks
+            section: Section index for the chunks (-1 for none)
+            page_start: First page of the text
+            page_end: Last page of the text
+        """
+        starts = []
+        ends = []
+        for match in WORD_PATTERN.finditer(self.segments[segment], start, end):
+            starts.append(match.start())
+            ends.append(match.end())
+        if not starts:
+            return
+
+        normalized_length = sum(ends) - sum(starts) + len(starts) - 1
+        self._add_windows(segment, starts, ends, normalized_length,
+                          chunk_size, overlap, section, page_start, page_end)
+
+    def _add_windows(self, segment: int, starts: List[int], ends: List[int], text_length: int,
+                     chunk_size: int, overlap: int, section: int, page_start: int, page_end: int) -> None:
+        """Add word-window rows given each word's start and end offset in the segment."""
+        word_total = len(ends)
+
+        # Calculate approximate words per chunk; at least one word per chunk
+        # and per step, so very long words or overlap >= chunk_size still end
+        chars_per_word = text_length / word_total
+        words_per_chunk = max(1, int(chunk_size / chars_per_word))
+        words_overlap = int(overlap / chars_per_word)
+        step = max(1, words_per_chunk - words_overlap)
+
+        start = 0
+        while start < word_total:
+            end = min(start + words_per_chunk, word_total)
+            self.append(segment, starts[start], ends[end - 1], end - start,
+                        start_word=start, section=section, page_start=page_start, page_end=page_end)
+
+            start += step
+
+            # Avoid very small last chunks
+            if word_total - start < words_overlap:
+                break
+
+    def text(self, index: int) -> str:
+        """Return the text of a chunk."""
+        return self.segments[self.segment[index]][self.start[index]:self.end[index]]
+
+    def chunk_dict(self, index: int) -> Dict[str, Any]:
+        """
+        Return a chunk as a dictionary: the structural shape (section and
+        pages) for sectioned chunks, otherwise the plain word-window shape.
+
+        Args:
+            index: Chunk index
+
+        Returns:
+            Chunk dictionary
+        """
+        text = self.text(index)
+        section = self.section_index[index]
+        if section >= 0:
+            return {
+                "chunk_id": index,
+                "text": text,
+                "section": self.sections[section],
+                "page_start": self.page_start[index],
+                "page_end": self.page_end[index],
+                "char_count": len(text),
+                "word_count": self.word_count[index]
+            }
+        start_word = self.start_word[index]
+        return {
+            "chunk_id": index,
+            "text": text,
+            "start_word": start_word,
+            "end_word": start_word + self.word_count[index],
+            "char_count": len(text),
+            "word_count": self.word_count[index]
+        }
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Convert all chunks to dictionaries."""
+        return [self.chunk_dict(i) for i in range(len(self))]
+
+
+def dump_result(result: Dict[str, Any], compact: bool = False) -> str:
+    """
+    Serialize a tool result to JSON.
+
+    Args:
+        result: Tool result dictionary
+        compact: Minified output (using orjson when installed) instead of
+            the default indent=2 format
+
+    Returns:
+        JSON string
+    """
+    if not compact:
+        return json.dumps(result, indent=2)
+    if orjson is not None:
+        try:
+            return orjson.dumps(result).decode("utf-8")
+        except TypeError:
+            pass
+    return json.dumps(result, separators=(",", ":"), ensure_ascii=False)
+
+
+def load_json(text: Union[str, bytes]) -> Any:
+    """
+    Decode a JSON document, using orjson when installed.
+
+    Args:
+        text: JSON document
+
+    Returns:
+        Decoded value
+
+    Raises:
+        json.JSONDecodeError: If the document is malformed
+    """
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)